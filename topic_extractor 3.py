@@ -8,10 +8,17 @@ import os
 import sys
 import re
 import logging
-from bs4 import BeautifulSoup
+import time
+import csv
+import shutil
+import functools
+import multiprocessing
+import multiprocessing.connection
+from bs4 import BeautifulSoup, SoupStrainer
 import clr
 import spacy.lang.en
 import datetime
+import calendar
 from word2number import w2n
 import dateutil.parser
 
@@ -20,6 +27,137 @@ import pdfprocessor
 
 logger = logging.getLogger(__name__)
 
+## level below DEBUG for logging every line of a document (e.g. every period of performance topic line)
+TRACE = 5
+logging.addLevelName(TRACE, 'TRACE')
+
+def enable_trace_logging(enabled=True):
+    """
+    turns the TRACE logging of this module on (or back off) by setting the level of its logger
+    the handlers still need a level of TRACE or lower to output it
+    """
+
+    logger.setLevel(TRACE if enabled else logging.NOTSET)
+
+class BufferedText:
+    """
+    a text attribute that is built by adding pieces (Section text, Document all_text, ...)
+    the pieces are kept in a list and only joined when the text is read, then the joined text is cached
+    adding with += copies the whole text every time; use ClassName.attribute.add(obj, *pieces) instead
+    the length is kept too, so add can tell where the piece added is in the text
+    """
+
+    def __set_name__(self, owner, name):
+        self.pieces_name = '_' + name + '_pieces'
+        self.text_name = '_' + name + '_text'
+        self.length_name = '_' + name + '_length'
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        text = obj.__dict__[self.text_name]
+        if text is None:
+            text = ''.join(obj.__dict__[self.pieces_name])
+            obj.__dict__[self.pieces_name] = [text]
+            obj.__dict__[self.text_name] = text
+        return text
+
+    def __set__(self, obj, text):
+        obj.__dict__[self.pieces_name] = [text]
+        obj.__dict__[self.text_name] = text
+        obj.__dict__[self.length_name] = len(text)
+
+    def add(self, obj, *pieces):
+        """
+        adds pieces to the end of the text
+        returns the (start, end) span of the last piece in the text (e.g. of the line in Document.all_text.add(document, ' ', line_text))
+        """
+        obj.__dict__[self.pieces_name].extend(pieces)
+        obj.__dict__[self.text_name] = None
+        end = obj.__dict__[self.length_name] + sum(len(piece) for piece in pieces)
+        obj.__dict__[self.length_name] = end
+        return end - len(pieces[-1]), end
+
+def remove_spans(text, spans):
+    """
+    returns text without the (start, end) spans (Sections, custom lines, ... that are repeated), rebuilt once
+    spans can overlap, so a text that is part of a longer one doesnt split the longer one
+    """
+
+    if not spans:
+        return text
+
+    kept_text = []
+    position = 0
+    for start, end in sorted(spans):
+        if start > position:
+            kept_text.append(text[position:start])
+        position = max(position, end)
+    kept_text.append(text[position:])
+    return ''.join(kept_text)
+
+def find_text_spans(text, texts, anchor_length=16):
+    """
+    returns the (start, end) span of every place any of the texts is found in text (overlapping ones too), with one scan of text
+    the texts are grouped by their first anchor_length characters, one regex of these anchors finds every place one of them can start
+    and the texts with that anchor are checked there (a regex of the whole texts takes longer to compile than to run)
+    the anchors are put in the regex as a trie (e.g. ' a(?:b|c)' for ' ab' and ' ac'), so at each place it only follows the characters there instead of trying every anchor
+    texts shorter than the anchor are searched for on their own; they are few, only custom lines are that short
+    """
+
+    def trie_pattern(anchors):
+        anchors_by_character = {}
+        for anchor in anchors:
+            if anchor:
+                anchors_by_character.setdefault(anchor[0], []).append(anchor[1:])
+        branches = [re.escape(character) + trie_pattern(rests) for character, rests in anchors_by_character.items()]
+        if len(branches) <= 1:
+            return ''.join(branches)
+        return '(?:' + '|'.join(branches) + ')'
+
+    spans = []
+    if not text:
+        return spans
+    texts_by_anchor = {}
+    for searched_text in set(texts):
+        if len(searched_text) >= anchor_length:
+            texts_by_anchor.setdefault(searched_text[:anchor_length], []).append(searched_text)
+        elif searched_text:
+            start = text.find(searched_text)
+            while start != -1:
+                spans.append((start, start + len(searched_text)))
+                start = text.find(searched_text, start + 1)
+
+    if texts_by_anchor:
+        anchors_re = re.compile('(?=(' + trie_pattern(texts_by_anchor) + '))')
+        for match in anchors_re.finditer(text):
+            for searched_text in texts_by_anchor[match.group(1)]:
+                if text.startswith(searched_text, match.start()):
+                    spans.append((match.start(), match.start() + len(searched_text)))
+    return spans
+
+def linear_runs(pattern, whole_numbers=False):
+    """
+    returns the regex pattern with every \s*, (\s+)? and [‐–-]* (and \d+ with whole_numbers) matching a whole run of whitespace, dashes or digits or nothing
+    (they can only start at the start of a run and only stop at its end, like an atomic group but without a group, so the match group numbers dont move)
+    in the period of performance patterns several of them are next to each other with only optional parts in between,
+    so a run of n spaces or digits can be split between them in about n^2 to n^5 ways, and every split is tried before a match fails
+    now a run is matched by the first one that gets to it or by none, the time is linear in the run length
+    what follows each of them cant match the rest of its run, so the same text matches (greedy takes the whole run first anyway),
+    but the whitespace only captured by the (\s+) groups can move to another one of them
+    a \s* right after a group ending in a space (the ' ' date separator) is left as it is: that space can be from the middle of a run
+    a \s* right before that group matches the whole run or stops before the last space of the run (for the separator), the only places a match can go on from
+    whole_numbers is only for patterns where no match needs a number split in two, the dates (January 2020 is day 20 of year 20)
+    and the durations (option 12 years is option 1, 2 years) do, and they have no two number slots next to each other to be slow on
+    """
+
+    pattern = pattern.replace(r'(\s+)?', r'((?<!\s)\s+(?!\s))?')
+    pattern = re.sub(r'(?<! \))\\s\*(?!\([^()]*\| \))', lambda match: r'(?:(?<!\s)\s+(?!\s))?', pattern)
+    pattern = re.sub(r'\\s\*(?=\([^()]*\| \))', lambda match: r'(?:(?<!\s)\s+(?!\s)|(?<!\s)\s*(?= [^\S ]*(?!\s)))?', pattern)
+    if whole_numbers:
+        pattern = pattern.replace(r'\d+', r'(?<!\d)\d+(?!\d)')
+    return pattern.replace('[‐–-]*', '(?:(?<![‐–-])[‐–-]+(?![‐–-]))?')
+
 class Document:
     """
     the main class that holds all info relevant to an document being processed
@@ -43,8 +181,21 @@ class Document:
     full_pattern_words = period_pattern + filler_pattern + length_of_time_words_pattern
     full_pattern_dates = period_pattern + filler_pattern + length_of_time_dates_pattern
 
-    full_period_words_re = re.compile(full_pattern_words, re.IGNORECASE)
-    full_period_dates_re = re.compile(full_pattern_dates, re.IGNORECASE)
+    ## compiled with linear_runs, so a long run of spaces or digits cant make them backtrack for minutes (see benchmark_pop_patterns)
+    full_period_words_re = re.compile(linear_runs(full_pattern_words), re.IGNORECASE)
+    full_period_dates_re = re.compile(linear_runs(full_pattern_dates), re.IGNORECASE)
+    multiplier_words_pattern = r'((((one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|fourteen|fifteen|sixteen|seventeen|eighteen|nineteen|twenty|twenty[‐–-]one|twenty[‐–-]two|twenty[‐–-]three|twenty[‐–-]four)?(\s+)?(\(?\d+\)?)?))\s*,?(\s+)?((one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|fourteen|fifteen|sixteen|seventeen|eighteen|nineteen|twenty|twenty[‐–-]one|twenty[‐–-]two|twenty[‐–-]three|twenty[‐–-]four)?(\s+)?(\(?\d+\)?)?))\s*[‐–-]*(\s+)?((days?)|(months?)|(years?))\s*((base\s*(period)?)|(option\s*(period)?)|(award(-?|\s*)terms))'
+    multiplier_words_re = re.compile(linear_runs(multiplier_words_pattern, whole_numbers=True), re.IGNORECASE)
+    ## catch all format (case sensitive, runs on the text without parens)
+    length_of_time_words_re = re.compile(linear_runs(length_of_time_words_pattern, whole_numbers=True))
+
+    ## tokens for scan_period_of_performance_text
+    ## stop: a character that isnt in any of the format patterns, so no match can go across it
+    ## dot: only in the dates format, after a month (e.g. Jan. 1, 2020)
+    ## unit and period words and digits: at least one of them has to be in the part of the text for a format to match in it
+    pop_scan_re = re.compile(r'(?P<stop>[^\w\s:,()\-‐–/\\.])|(?P<dot>\.)|(?P<slash>[/\\])|(?P<paren>[()])|(?P<unit>day|month|year)|(?P<period>option|base|award)|(?P<digit>\d+)', re.IGNORECASE)
+    month_before_dot_re = re.compile(r'(Jan(uary)?|Feb(ruary)?|Mar(ch)?|May|Apr(il)?|Jul(y)?|Jun(e)?|Aug(ust)?|Oct(ober)?|Sep(tember)?|Nov(ember)?|Dec(ember)?)$', re.IGNORECASE)
+    parens_table = str.maketrans('', '', '()')
 
     option_period_match_group = 2
     option_period_number_match_group = 5
@@ -72,6 +223,10 @@ class Document:
     mult_words_key = 'mult_words'
     #################################################################################################################################################################################################################################################################################################################################################################################################################################################################################################################################################################################
 
+    all_text = BufferedText()
+    text_to_summarize = BufferedText()
+    text_to_summarize_raw = BufferedText()
+
     def __init__(self, doc_id, name, parsed_html_file_path):
         """
         initialize all member vars
@@ -86,8 +241,18 @@ class Document:
         self.cluster_matches = []
         self.sections = []
 
+        ## indexes for the lookups done for every regex span of every line
+        ## subtopic id -> Topics (in the order of self.topics), id -> first SubTopic / RegMatch, name -> first Topic
+        self.topics_by_subtopic_id = {}
+        self.subtopics_by_id = {}
+        self.reg_matches_by_id = {}
+        self.topics_by_name = {}
+        self.topic_positions = {}
+
         self.all_lines=[]
         self.all_text=''
+        ## line index -> (start, end) of the line text in all_text
+        self.all_text_line_spans = {}
 
         self.text_to_summarize = ''
         self.text_to_summarize_list = []
@@ -105,6 +270,11 @@ class Document:
         self.contract_data = {}
 
         self.text_to_summarize_raw = ''
+        ## Sections and custom lines already in text_to_summarize_raw, by identity (id) and Section text
+        ## so most repeated text is known without searching text_to_summarize_raw for it
+        self.summary_section_ids = set()
+        self.summary_section_texts = set()
+        self.summary_custom_line_ids = set()
 
         self.debug_html_file = None
 
@@ -112,48 +282,71 @@ class Document:
         """
         adds Topic to Document
         """
+        self.topic_positions[topic] = len(self.topics)
         self.topics.append(topic)
         self.topics_dict[topic.name] = topic
+        self.topics_by_name.setdefault(topic.name, topic)
+        for subtopic_id in topic.subtopic_ids:
+            self.index_topic_by_subtopic_id(topic, subtopic_id)
+
+    def add_subtopic(self, subtopic):
+        """
+        adds a SubTopic (RegMatch or ClusterMatch) to Document
+        """
+        self.subtopics.append(subtopic)
+        self.subtopics_by_id.setdefault(subtopic.subtopic_id, subtopic)
+        if subtopic.is_regex:
+            self.reg_matches.append(subtopic)
+            self.reg_matches_by_id.setdefault(subtopic.subtopic_id, subtopic)
+        else:
+            self.cluster_matches.append(subtopic)
+
+    def add_subtopic_to_topic(self, topic, subtopic):
+        """
+        adds a SubTopic to a Topic that was already added to Document
+        """
+        topic.add_subtopic(subtopic)
+        if topic in self.topic_positions:
+            self.index_topic_by_subtopic_id(topic, subtopic.subtopic_id)
+
+    def index_topic_by_subtopic_id(self, topic, subtopic_id):
+        """
+        adds a Topic to the Topics of a Subtopic ID, keeping the order of self.topics
+        """
+        topics_with_id = self.topics_by_subtopic_id.setdefault(subtopic_id, [])
+        if topic not in topics_with_id:
+            topics_with_id.append(topic)
+            ## only a subtopic added to an earlier topic after parsing can be out of order
+            if len(topics_with_id) > 1 and self.topic_positions[topics_with_id[-2]] > self.topic_positions[topic]:
+                topics_with_id.sort(key=self.topic_positions.get)
 
     def get_topics_by_subtopic_id(self, subtopic_id):
         """
         returns Topics associated with a Subtopic ID
         """
 
-        topics_to_return = []
-        for topic in self.topics:
-            if subtopic_id in topic.subtopic_ids:
-                topics_to_return.append(topic)
-        return topics_to_return
+        return list(self.topics_by_subtopic_id.get(subtopic_id, []))
     
     def get_topic_by_name(self, topics, name):
         """
         returns a Topic by name
         """
 
-        for topic in self.topics:
-            if name == topic.name:
-                return topic
+        return self.topics_by_name.get(name)
 
     def get_regmatch_by_regmatch_id(self, regmatch_id):
         """
         returns a RegMatch by RegMatch ID
         """
 
-        for reg_match in self.reg_matches:
-            if regmatch_id == reg_match.subtopic_id:
-                return reg_match 
-        return None  
+        return self.reg_matches_by_id.get(regmatch_id)
 
     def get_subtopic_by_subtopic_id(self, subtopic_id):
         """
         returns a RegMatch by RegMatch ID
         """
 
-        for subtopic in self.subtopics:
-            if subtopic_id == subtopic.subtopic_id:
-                return subtopic 
-        return None  
+        return self.subtopics_by_id.get(subtopic_id)
 
     def add_text_to_summarize(self, topic):
         """
@@ -164,34 +357,67 @@ class Document:
         text_added = False
 
         if text_to_add.strip() != '':
-            self.text_to_summarize += '\n' 
-            self.text_to_summarize += text_to_add
+            Document.text_to_summarize.add(self, '\n', text_to_add)
             
-            self.text_to_summarize_raw += '\n' 
-            self.text_to_summarize_raw += topic.text
+            Document.text_to_summarize_raw.add(self, '\n', topic.text)
 
             self.text_to_summarize_list.append(text_to_add)
             self.text_to_summarize_dict[topic.name] = topic
             self.text_to_summarize_name_list.append(topic.name)
             text_added = True
+
+            self.summary_section_ids.update(id(section) for section in topic.sections)
+            self.summary_section_texts.update(section.text for section in topic.sections)
+            self.summary_custom_line_ids.update(id(custom_line) for custom_line in topic.custom_line_elements_added)
             
         return text_added
 
+    def get_all_text_span(self, section):
+        """
+        returns the (start, end) span of the Section text in all_text, or None if it isnt there as one piece
+        """
+
+        if not section.line_element_indices:
+            return None
+        first_line_span = self.all_text_line_spans.get(section.line_element_indices[0])
+        last_line_span = self.all_text_line_spans.get(section.line_element_indices[-1])
+        ## the Section text starts with the ' ' before its first line, like all_text
+        if first_line_span is None or last_line_span is None or self.all_text[first_line_span[0] - 1:last_line_span[1]] != section.text:
+            return None
+        return first_line_span[0] - 1, last_line_span[1]
+
     def clean_text_for_summary(self, topic):
         """
         cleans text for summary
         removes any repeated text
+        repeated Sections and custom lines are removed by their spans in the Topic text (Topic.section_text_spans, Topic.custom_line_text_spans)
+        the ones already added are known by identity (or Section text), the others are searched for in text_to_summarize_raw all at once (find_text_spans)
         """
 
-        text = topic.text
-        for section_ind, section in enumerate(topic.sections):
-            if section.text in self.text_to_summarize_raw:
-                text = text.replace(section.text, '')
-                logger.debug('REMOVE REPEATED SECTION TEXT in SECTION ' + str (section_ind) + ' OF TOPIC ' + str(topic.name) + ' FROM TEXT TO SUMMARIZE:: ' + str(section.text))
-        for custom_line in topic.custom_line_elements_added:
-            if custom_line.text in self.text_to_summarize_raw:
-                text = text.replace(custom_line.text, '')
-                logger.debug('REMOVE REPEATED CUSTOM LINE TEXT OF TOPIC ' + str(topic.name) + ' FROM TEXT TO SUMMARIZE:: ' + str (custom_line.text))
+        spans = []
+        ## text -> spans in the Topic text, of the Sections and custom lines that can still be in text_to_summarize_raw
+        searched_spans = {}
+        for section_ind, (section, span) in enumerate(zip(topic.sections, topic.section_text_spans)):
+            if id(section) in self.summary_section_ids or section.text in self.summary_section_texts:
+                spans.append(span)
+                logger.debug('REMOVE REPEATED SECTION TEXT in SECTION %s OF TOPIC %s FROM TEXT TO SUMMARIZE:: %s', section_ind, topic.name, section.text)
+            elif section.text:
+                searched_spans.setdefault(section.text, []).append(span)
+        for custom_line, span in zip(topic.custom_line_elements_added, topic.custom_line_text_spans):
+            if id(custom_line) in self.summary_custom_line_ids:
+                spans.append(span)
+                logger.debug('REMOVE REPEATED CUSTOM LINE TEXT OF TOPIC %s FROM TEXT TO SUMMARIZE:: %s', topic.name, custom_line.text)
+            elif custom_line.text:
+                searched_spans.setdefault(custom_line.text, []).append(span)
+
+        if searched_spans:
+            text_to_summarize_raw = self.text_to_summarize_raw
+            for start, end in find_text_spans(text_to_summarize_raw, searched_spans):
+                repeated_text = text_to_summarize_raw[start:end]
+                if repeated_text in searched_spans:
+                    logger.debug('REMOVE REPEATED TEXT OF TOPIC %s FROM TEXT TO SUMMARIZE:: %s', topic.name, repeated_text)
+                    spans.extend(searched_spans.pop(repeated_text))
+        text = remove_spans(topic.text, spans)
 
         for replace_regex in self.replace_regexes:
             text = replace_regex.sub('', text)
@@ -206,6 +432,8 @@ class Topic:
     holds SubTopics (RegMatches and ClusterMatches), text, line elements, and Sections
     """
 
+    text = BufferedText()
+
     def __init__(self, name):
        self.name = name
        self.subtopics = []
@@ -215,6 +443,8 @@ class Topic:
        self.clustermatches = []
        self.clustermatch_ids = []
        self.sections = []
+       ## Sections already in self.sections, for membership checks without a list scan
+       self.section_set = set()
        self.sections_added_by = []
        self.sections_scores = {}
        self.text = ''
@@ -225,6 +455,10 @@ class Topic:
 
        self.custom_line_element_indices = []
        self.line_element_indices = []
+       ## (start, end) of every Section text and custom line text in self.text, in the order of self.sections and self.custom_line_elements_added
+       self.section_text_spans = []
+       self.custom_line_text_spans = []
+       self.custom_line_element_indices_added = []
 
        
     def add_subtopic(self, new_subtopic):
@@ -247,8 +481,9 @@ class Topic:
         """
 
         if not custom_lines:
-            if new_section not in self.sections:
+            if new_section not in self.section_set:
                 self.sections.append(new_section)
+                self.section_set.add(new_section)
                 self.sections_added_by.append(added_by)
         else:
             self.custom_line_elements.extend(custom_lines)
@@ -260,37 +495,52 @@ class Topic:
         have to wait until after processing entire Document before adding all of the Section text to the Topic
         fucntion to update the text in the Topic after processing the Document has finshed
         dont add repeated lines
+        a line is repeated if it is the same element (by id) or an element with the same markup (e.g. a header repeated on every page), same as bs4 == but with sets
         """
 
+        ## the text is only read (joined) at the end, so whether it's still empty is kept on the side
+        has_text = self.text != ''
         for section in self.sections:
-            if self.text != '':
-                self.text += ' '
-            self.text += section.text
+            if has_text:
+                Topic.text.add(self, ' ')
+            self.section_text_spans.append(Topic.text.add(self, section.text))
+            has_text = has_text or section.text != ''
             # self.text += '.'
             self.line_elements.extend(section.line_elements)
             self.line_element_indices.extend(section.line_element_indices)
 
+        line_element_ids = set(id(line_element) for line_element in self.line_elements)
+        line_element_markups = set(str(line_element) for line_element in self.line_elements)
+
         last_line_index_added = None
         for loop_index, custom_line_element in enumerate(self.custom_line_elements):
-            if custom_line_element not in self.line_elements:
+            ## the id is checked first, the markup is only made for lines that are not the same element
+            if id(custom_line_element) not in line_element_ids and str(custom_line_element) not in line_element_markups:
                 
-                if self.text != '':
+                if has_text:
                     # if last_line_index_added and (last_line_index_added != self.custom_line_element_indices[loop_index] - 1):
                     #     self.text += '.'
                     #     logger.debug('adding period bc custom line does NOT follow previous line in doc: ' + str(last_line_index_added) + ' --> ' + str(self.custom_line_element_indices[loop_index]))
                     # else:
                     #     logger.debug('not adding period bc custom line follows previous line in doc: ' + str(last_line_index_added) + ' --> ' + str(self.custom_line_element_indices[loop_index]))
-                    self.text += ' '
+                    Topic.text.add(self, ' ')
 
                 self.line_elements.append(custom_line_element)
+                line_element_ids.add(id(custom_line_element))
+                line_element_markups.add(str(custom_line_element))
                 self.line_element_indices.append(self.custom_line_element_indices[loop_index])
                 last_line_index_added = self.custom_line_element_indices[loop_index]
                 # TODO: add period to text for sentencizer --- commented out -- didnt like it
-                logger.debug('adding custom line: ' + str(custom_line_element.get_text().encode("utf-8")))
-                self.text += custom_line_element.get_text() 
+                custom_line_text = custom_line_element.get_text()
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug('adding custom line: %s', custom_line_text.encode("utf-8"))
+                self.custom_line_text_spans.append(Topic.text.add(self, custom_line_text))
+                has_text = has_text or custom_line_text != ''
                 self.custom_line_elements_added.append(custom_line_element)
+                self.custom_line_element_indices_added.append(self.custom_line_element_indices[loop_index])
             else:
-                logger.debug('skipping duplicate line: ' + str(custom_line_element.get_text().encode("utf-8")))
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug('skipping duplicate line: %s', custom_line_element.get_text().encode("utf-8"))
         
         # if self.text.strip() != '':
         #     self.text += '.'
@@ -410,6 +660,9 @@ class Section:
     represents a small part of text from the input doc - usually a paragraph - seperated by whitespace
     """
 
+    text = BufferedText()
+    section_head_text = BufferedText()
+
     def __init__(self, section_head=None, section_head_text=''):
        self.section_head_lines = []
        self.section_head_lines.append(section_head)
@@ -424,8 +677,7 @@ class Section:
         """
         adds text to the section
         """
-        self.text += ' '
-        self.text += new_text
+        Section.text.add(self, ' ', new_text)
         
     def add_section_head_line(self, new_section_head_line):
         """
@@ -439,8 +691,7 @@ class Section:
         adds the text of the section header line
         """
 
-        self.section_head_text += ' '
-        self.section_head_text += new_text
+        Section.section_head_text.add(self, ' ', new_text)
         
     def add_line_element(self, new_element, line_index):
         """
@@ -613,16 +864,14 @@ def parse_topics(rr_section_boxes, document, add_all_clusters=False, cluster_cut
                 logger.debug('add_all_clusters = True; adding cluster')
 
             if add_cluster_match:
-                document.subtopics.append(new_cluster_match)
-                document.cluster_matches.append(new_cluster_match)
+                document.add_subtopic(new_cluster_match)
                 new_topic.add_subtopic(new_cluster_match)
                          
         ## loop through RegMatches and add them to Topic
         reg_match_elements = rr_section_box.find_all('span', {"id_off" : RegMatch.reg_match_ele_re})
         for reg_match_element in reg_match_elements:
             new_reg_match = RegMatch(name=reg_match_element.get_text(), is_regex=True, subtopic_id=reg_match_element['id_off'])
-            document.subtopics.append(new_reg_match)
-            document.reg_matches.append(new_reg_match)
+            document.add_subtopic(new_reg_match)
             new_topic.add_subtopic(new_reg_match)
               
         document.add_topic(topic=new_topic)
@@ -686,7 +935,7 @@ def parse_sections(rr_lines, document):
             assign_topic_and_section(document, current_section, subtopic_cluster_id, custom_lines=None, custom_line_indices=None, added_by='ML CLUSTER MATCH')
             ## add_next_section is True when a RegMatch title ended the last section
             if add_next_section:
-                logger.debug('ADDING NEXT SECTION BC TITLE MATCH ENDED PREV SECTION: ' + str(subtopic_id_to_add_next))
+                logger.debug('ADDING NEXT SECTION BC TITLE MATCH ENDED PREV SECTION: %s', subtopic_id_to_add_next)
                 assign_topic_and_section(document, current_section, subtopic_id_to_add_next, custom_lines=None, custom_line_indices=None, added_by='SECTION HEADER 2')
             document.sections.append(current_section)
             ## check section head text for matching regex
@@ -744,13 +993,13 @@ def parse_sections(rr_lines, document):
 
             
         if first_line_after_full_section_head:
-            logger.error("FIRST LINE AFTER FULL SECTION HEAD")
+            logger.log(TRACE, "FIRST LINE AFTER FULL SECTION HEAD")
             for topic_key in RegMatch.specific_titles.keys():
                 for reg_to_search in RegMatch.specific_titles[topic_key]:
                     if re.search(reg_to_search, current_section.section_head_text, flags=re.IGNORECASE):
-                        logger.debug(f"found specific title match: {reg_to_search} :: {current_section.section_head_text}")
+                        logger.debug("found specific title match: %s :: %s", reg_to_search, current_section.section_head_text)
 
-                        document.topics_dict[topic_key].add_subtopic(document.get_subtopic_by_subtopic_id(subtopic_cluster_id))
+                        document.add_subtopic_to_topic(document.topics_dict[topic_key], document.get_subtopic_by_subtopic_id(subtopic_cluster_id))
                         assign_topic_and_section(document, current_section, subtopic_cluster_id, custom_lines=None, custom_line_indices=None, added_by = 'SECTION HEADER 3')
 
 
@@ -782,8 +1031,7 @@ def parse_sections(rr_lines, document):
             current_section.add_text(line_text)
             current_section.add_line_element(rr_line, line_index)
         
-        document.all_text += ' '
-        document.all_text += line_text
+        document.all_text_line_spans[line_index] = Document.all_text.add(document, ' ', line_text)
         document.all_lines.append(rr_line)
 
         previous_top = rr_line.get('style').split('top:')[1].split('px')[0]
@@ -797,17 +1045,41 @@ def parse_sections(rr_lines, document):
         previous_line_was_section_header = added_to_section_header_text
 
         if 'anti-inflammatory medications or analgesics' in line_text:
-            logger.error(line_text)
+            logger.log(TRACE, line_text)
         
     
-def parse_html(doc_id, input_base_name, input_file_path, add_all_clusters=False, cluster_cutoff_score=0.0):
+## html parsers that parse_html can use
+## 'html.parser' builds the tree of the whole file
+## 'strained' only builds the rr_section_box and rr_line divs (and everything inside them)
+## 'lxml' is the same as 'strained' but with the C-backed lxml parser
+HTML_PARSERS = ['html.parser', 'strained', 'lxml']
+
+def make_soup(html_contents, html_parser='html.parser'):
+    """
+    builds the soup of the html contents with one of HTML_PARSERS
+    """
+
+    if html_parser == 'html.parser':
+        return BeautifulSoup(html_contents, 'html.parser')
+
+    ## parse_html only ever looks at these two divs, nothing else has to be built
+    only_boxes_and_lines = SoupStrainer('div', attrs={'class': ['rr_section_box', 'rr_line']})
+    if html_parser == 'strained':
+        return BeautifulSoup(html_contents, 'html.parser', parse_only=only_boxes_and_lines)
+    elif html_parser == 'lxml':
+        return BeautifulSoup(html_contents, 'lxml', parse_only=only_boxes_and_lines)
+
+    raise ValueError('unknown html parser: ' + str(html_parser))
+
+def parse_html(doc_id, input_base_name, input_file_path, add_all_clusters=False, cluster_cutoff_score=0.0, html_parser='html.parser'):
      """
      parse the html file for Topics and Sections
+     html_parser is one of HTML_PARSERS
      """
 
      with open(input_file_path, encoding="utf-8") as html_file:
         html_contents = html_file.read()
-        soup = BeautifulSoup(html_contents, 'html.parser')
+        soup = make_soup(html_contents, html_parser=html_parser)
         
         new_document = Document(doc_id=doc_id, name=input_base_name, parsed_html_file_path=input_file_path)
 
@@ -828,16 +1100,109 @@ def parse_html(doc_id, input_base_name, input_file_path, add_all_clusters=False,
             
         return new_document
 
-def scrape_pop_days_duration_words(periods, text):
+def benchmark_parse_html(input_file_path, html_parsers=HTML_PARSERS, repeat=3):
+    """
+    times parse_html with each html parser on one .parsed.html file
+    checks that every parser builds the same Document as the first one
+    returns {html_parser: best time in seconds}
+    """
+
+    timings = {}
+    first_result = None
+    for html_parser in html_parsers:
+        best_time = None
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            document = parse_html(doc_id=None, input_base_name=os.path.basename(input_file_path), input_file_path=input_file_path, html_parser=html_parser)
+            elapsed_time = time.perf_counter() - start_time
+            if best_time is None or elapsed_time < best_time:
+                best_time = elapsed_time
+        timings[html_parser] = best_time
+
+        ## the text of the doc and of every topic has to be the same
+        result = (document.all_text, [(topic.name, topic.text) for topic in document.topics])
+        if first_result is None:
+            first_result = result
+        elif result != first_result:
+            logger.error('html parser ' + str(html_parser) + ' built a different Document than ' + str(html_parsers[0]))
+
+        logger.info('parse_html with ' + str(html_parser) + ': ' + str(round(best_time, 3)) + 's (' + str(round(timings[html_parsers[0]] / best_time, 2)) + 'x)')
+
+    return timings
+
+def benchmark_topic_line_elements(num_lines=20000, lines_per_section=20, custom_line_every=3):
+    """
+    times Topic.add_section and Topic.update_text_and_line_elements on a large synthetic Topic
+    every line is in a Section, and every custom_line_every-th line is also added as a custom line (with the lines around it)
+    returns the time in seconds
+    """
+
+    html_contents = ''.join('<div class="rr_line" style="top:' + str(line_index) + 'px">line ' + str(line_index) + ' of the synthetic topic</div>' for line_index in range(num_lines))
+    rr_lines = BeautifulSoup(html_contents, 'html.parser').find_all('div', 'rr_line')
+
+    start_time = time.perf_counter()
+    topic = Topic('BENCHMARK')
+    section = None
+    for line_index, rr_line in enumerate(rr_lines):
+        if line_index % lines_per_section == 0:
+            section = Section(section_head=rr_line, section_head_text=rr_line.get_text())
+        section.add_text(rr_line.get_text())
+        section.add_line_element(rr_line, line_index)
+        topic.add_section(section)
+        if line_index % custom_line_every == 0:
+            custom_lines = rr_lines[max(line_index - 1, 0):line_index + 2]
+            topic.add_section(section, custom_lines=custom_lines, custom_line_indices=list(range(max(line_index - 1, 0), max(line_index - 1, 0) + len(custom_lines))))
+    topic.update_text_and_line_elements()
+    elapsed_time = time.perf_counter() - start_time
+
+    logger.info('Topic with ' + str(num_lines) + ' lines and ' + str(len(topic.custom_line_elements)) + ' custom lines: ' + str(round(elapsed_time, 3)) + 's')
+    return elapsed_time
+
+## number words the period of performance regexes can match, with every hyphen they allow and the number after it in parens (e.g. twelve (12))
+NUMBER_WORDS = {number_word.replace('-', hyphen) + parens: number
+                for number, number_word in enumerate(['one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten', 'eleven', 'twelve', 'thirteen', 'fourteen', 'fifteen', 'sixteen',
+                                                      'seventeen', 'eighteen', 'nineteen', 'twenty', 'twenty-one', 'twenty-two', 'twenty-three', 'twenty-four'], start=1)
+                for hyphen in '‐–-'
+                for parens in ('', ' (' + str(number) + ')', '(' + str(number) + ')')}
+
+@functools.lru_cache(maxsize=1024)
+def w2n_word_to_num(number_text):
+    """
+    returns w2n.word_to_num of the text, or None if w2n cant convert it
+    """
+
+    try:
+        return w2n.word_to_num(number_text)
+    except Exception:
+        return None
+
+def word_to_num(number_text):
+    """
+    returns the number for a number found by the period of performance regexes (digits or a number word, e.g. 12, twelve, twenty-one, twelve (12)), or None if it isnt one
+    the number words the regexes can match are looked up in NUMBER_WORDS, any other text (e.g. the option period name) goes to w2n
+    """
+
+    number_text = number_text.lower()
+    if number_text.isdigit() and number_text.isascii():
+        return int(number_text)
+    number = NUMBER_WORDS.get(number_text)
+    if number is None:
+        number = w2n_word_to_num(number_text)
+    return number
+
+def scrape_pop_days_duration_words(periods, text, matches=None):
     """
     format 1 for finding period of performance in text
     e.g. option period 4: 12 months
+    matches are the format matches in text if already found (scan_period_of_performance_text)
     """
 
     periods[Document.duration_words_key] = {}
+    if matches is None:
+        matches = re.finditer(Document.full_period_words_re, text)
 
     ## loop through all matches of format
-    for match_ind, match in enumerate(re.finditer(Document.full_period_words_re, text)):
+    for match_ind, match in enumerate(matches):
         found_period = False
 
         period_key = ''
@@ -854,7 +1219,7 @@ def scrape_pop_days_duration_words(periods, text):
         elif match.group(Document.option_period_match_group):
             option_title = match.group(Document.option_period_match_group)
        
-            logger.debug(str(option_title))
+            logger.debug('%s', option_title)
             
             ## find option period number to keep track of the options and not repeat them
             option_number = None
@@ -862,11 +1227,9 @@ def scrape_pop_days_duration_words(periods, text):
             ## check for option period number match group from regex
             if match.group(Document.option_period_number_match_group):
                 option_number = match.group(Document.option_period_number_match_group)
-                try:
-                    option_number = w2n.word_to_num(option_number)
-                except Exception as e:
+                option_number = word_to_num(option_number)
+                if option_number is None:
                     logger.error('could not convert option number using w2n: ' + str(match.group(Document.option_period_number_match_group)))
-                    option_number = None
 
             if option_number:
                 period_key = 'option_'+ str(option_number)
@@ -884,7 +1247,7 @@ def scrape_pop_days_duration_words(periods, text):
         ## check for award period(s)
         elif match.group(Document.award_term_period_match_group):
             award_title = match.group(Document.award_term_period_match_group)
-            logger.debug(str(award_title))
+            logger.debug('%s', award_title)
             
             ## find award period number to keep track of the awards and not repeat them
             award_number = None
@@ -893,11 +1256,9 @@ def scrape_pop_days_duration_words(periods, text):
             if match.group(Document.award_term_period_number_match_group):
                 award_number = match.group(Document.award_term_period_number_match_group)
 
-                try:
-                    award_number = w2n.word_to_num(award_number)
-                except Exception as e:
+                award_number = word_to_num(award_number)
+                if award_number is None:
                     logger.error('could not convert award number using w2n: ' + str(match.group(Document.award_term_period_number_match_group)))
-                    award_number = None
 
             if award_number:
                 period_key = 'award_'+ str(award_number)
@@ -916,7 +1277,7 @@ def scrape_pop_days_duration_words(periods, text):
         ## if valid period found, parse it
         if found_period:
             logger.debug('found pop period!')  
-            logger.debug(str(period_key))
+            logger.debug('%s', period_key)
 
             ## check to see if it's a repeated period key; if not, attempt to parse
             if period_key not in periods[Document.duration_words_key].keys():
@@ -937,12 +1298,9 @@ def scrape_pop_days_duration_words(periods, text):
                     ## different matchgroup for number words 
                     ## e.g. two
                     elif match.group(Document.duration_number_second_match_group):
-                        try:
-                            duration_number = w2n.word_to_num(match.group(Document.duration_number_second_match_group))
-                        except Exception as e:
+                        duration_number = word_to_num(match.group(Document.duration_number_second_match_group))
+                        if duration_number is None:
                             logger.error('duration number (word) cannot be converted to int for: ' + str(period_key))
-                            logger.error( str(e))
-                            logger.error(type(e).__name__)
                             continue
 
                     periods[Document.duration_words_key][period_key] = {'text': match.group(Document.duration_match_group)}
@@ -979,21 +1337,58 @@ def scrape_pop_days_duration_words(periods, text):
                     logger.warning('could not add period... duration match group not found')
 
             else:
-                logger.warning('not overwriting duplicate period of performance period: ' + str(period_key))
+                logger.warning('not overwriting duplicate period of performance period: %s', period_key)
 
 
     return periods
 
-def scrape_pop_days_dates(periods, text):
+## month names the dates format can match
+MONTHS = {'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3, 'apr': 4, 'april': 4, 'may': 5, 'jun': 6, 'june': 6,
+          'jul': 7, 'july': 7, 'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9, 'oct': 10, 'october': 10, 'nov': 11, 'november': 11, 'dec': 12, 'december': 12}
+## MM/DD/YYYY or month name, day and year (e.g. July 1st, 2020); the dates that can be read without dateutil
+## (dateutil reads a comma right before the year, e.g. July 1,2020, as a decimal and uses the current year, so those are left to it)
+POP_DATE_RE = re.compile(r'(?:(?P<month>\d{1,2})/(?P<day>\d{1,2})/|(?P<month_name>[a-z]+)\s*\.?\s*(?P<day_of_month>\d{1,2})(?:st|nd|rd|th)?,?\s+)(?P<year>\d{4})', re.IGNORECASE)
+FEB_29_DATE_RE = re.compile(r'Feb(ruary)?\s*\.?\s*29', re.IGNORECASE)
+
+@functools.lru_cache(maxsize=4096)
+def parse_pop_date(date_text):
+    """
+    returns the datetime for a date found by the dates format (e.g. 07/01/2020, July 1st, 2020), or None if it cant be parsed
+    MM/DD/YYYY and month name, day and year are read directly, anything else (e.g. 2 digit years, July 2020) goes to dateutil
+    """
+
+    match = POP_DATE_RE.fullmatch(date_text)
+    if match:
+        if match.group('month_name'):
+            month = MONTHS.get(match.group('month_name').lower())
+            day = int(match.group('day_of_month'))
+        else:
+            month = int(match.group('month'))
+            day = int(match.group('day'))
+        year = int(match.group('year'))
+
+        ## dateutil reads a first number over 12 as the day, leave those to it
+        if month and month <= 12 and year and 1 <= day <= calendar.monthrange(year, month)[1]:
+            return datetime.datetime(year, month, day)
+
+    try:
+        return dateutil.parser.parse(date_text)
+    except Exception:
+        return None
+
+def scrape_pop_days_dates(periods, text, matches=None):
     """
     format 2 for finding period of performance in text
     e.g. option period 1: July, 2020 - July, 2023
+    matches are the format matches in text if already found (scan_period_of_performance_text)
     """
 
     periods[Document.dates_key] = {}
+    if matches is None:
+        matches = re.finditer(Document.full_period_dates_re, text)
 
     ## loop through format regex matches
-    for match_ind, match in enumerate(re.finditer(Document.full_period_dates_re, text)):
+    for match_ind, match in enumerate(matches):
         found_period = False
 
         period_key = ''
@@ -1009,7 +1404,7 @@ def scrape_pop_days_dates(periods, text):
         # option period
         elif match.group(Document.option_period_match_group):
             option_title = match.group(Document.option_period_match_group)
-            logger.debug(str(option_title))
+            logger.debug('%s', option_title)
             
             ## find option period number - used to not repeat option periods
             option_number = None
@@ -1017,11 +1412,9 @@ def scrape_pop_days_dates(periods, text):
             ## check option number match group
             if match.group(Document.option_period_number_match_group):
                 option_number = match.group(Document.option_period_number_match_group)
-                try:
-                    option_number = w2n.word_to_num(option_number)
-                except Exception as e:
+                option_number = word_to_num(option_number)
+                if option_number is None:
                     logger.error('could not convert option number using w2n: ' + str(match.group(Document.option_period_number_match_group)))
-                    option_number = None
 
             if option_number:
                 period_key = 'option_'+ str(option_number)
@@ -1040,18 +1433,16 @@ def scrape_pop_days_dates(periods, text):
         ## award period
         elif match.group(Document.award_term_period_match_group):
             award_title = match.group(Document.award_term_period_match_group)
-            logger.debug(str(award_title))
+            logger.debug('%s', award_title)
             
             ## find award period number - used to not repeat award periods
             award_number = None
             
             if match.group(Document.award_term_period_number_match_group):
                 award_number = match.group(Document.award_term_period_number_match_group)
-                try:
-                    award_number = w2n.word_to_num(award_number)
-                except Exception as e:
+                award_number = word_to_num(award_number)
+                if award_number is None:
                     logger.error('could not convert award number using w2n: ' + str(match.group(Document.award_term_period_number_match_group)))
-                    award_number = None
 
             if award_number:
                 period_key = 'award_'+ str(award_number)
@@ -1070,7 +1461,7 @@ def scrape_pop_days_dates(periods, text):
         ## if valid period found, attempt to parse it
         if found_period:
             logger.debug('found pop period!')  
-            logger.debug(str(period_key)) 
+            logger.debug('%s', period_key) 
             if period_key not in periods[Document.dates_key].keys():
                 logger.debug('unique period found; attempting to add')
 
@@ -1083,34 +1474,19 @@ def scrape_pop_days_dates(periods, text):
                         
 
                     ## check for invalid feb 29.. dont want to error on this; just switch the feb 28 instead
-                    feb_29_date_pattern = r'Feb(ruary)?\s*\.?\s*29'
-                    feb_29_date_re = re.compile(feb_29_date_pattern, re.IGNORECASE)
-
-                    try:
-                        if re.search(feb_29_date_re, periods[Document.dates_key][period_key]['date1_text'] ):
-                            test = dateutil.parser.parse(periods[Document.dates_key][period_key]['date1_text'])
-
-                    # except ValueError as e:
-                    except Exception as e:
+                    if FEB_29_DATE_RE.search(periods[Document.dates_key][period_key]['date1_text']) and parse_pop_date(periods[Document.dates_key][period_key]['date1_text']) is None:
                         logger.error('date1: invalid feb 29 date - changing to feb 28')
                         periods[Document.dates_key][period_key]['date1_text'] = periods[Document.dates_key][period_key]['date1_text'].replace('29', '28')
 
-                    try:
-                        if re.search(feb_29_date_re, periods[Document.dates_key][period_key]['date2_text'] ):
-                            test = dateutil.parser.parse(periods[Document.dates_key][period_key]['date2_text'])
-
-                    except Exception as e:
+                    if FEB_29_DATE_RE.search(periods[Document.dates_key][period_key]['date2_text']) and parse_pop_date(periods[Document.dates_key][period_key]['date2_text']) is None:
                         logger.error('date2: invalid feb 29 date - changing to feb 28')
                         periods[Document.dates_key][period_key]['date2_text'] = periods[Document.dates_key][period_key]['date2_text'].replace('29', '28')
 
                     ## attempt to convert date text to datetime objects
-                    try:
-                        periods[Document.dates_key][period_key]['date1'] = dateutil.parser.parse(periods[Document.dates_key][period_key]['date1_text'])
-                        periods[Document.dates_key][period_key]['date2'] = dateutil.parser.parse(periods[Document.dates_key][period_key]['date2_text'])
-                    except Exception as e: 
+                    periods[Document.dates_key][period_key]['date1'] = parse_pop_date(periods[Document.dates_key][period_key]['date1_text'])
+                    periods[Document.dates_key][period_key]['date2'] = parse_pop_date(periods[Document.dates_key][period_key]['date2_text'])
+                    if periods[Document.dates_key][period_key]['date1'] is None or periods[Document.dates_key][period_key]['date2'] is None:
                         logger.error('could not parse dates for : ' + str(period_key))
-                        logger.error( str(e))
-                        logger.error(type(e).__name__)
                         del periods[Document.dates_key][period_key]
                         continue
 
@@ -1129,17 +1505,16 @@ def scrape_pop_days_dates(periods, text):
                     logger.warning('could not add period... duration match group not found')
 
             else:
-                logger.warning('not overwriting duplicate period of performance period: ' + str(period_key))
+                logger.warning('not overwriting duplicate period of performance period: %s', period_key)
 
     return periods
 
-def scrape_pop_days_multiplier_words(periods, text, pop_lines_added, pop_lines_added_indices):
+def scrape_pop_days_multiplier_words(periods, text, pop_lines_added, pop_lines_added_indices, matches=None):
     """
     format 3 for finding period of performance in text
     e.g. four (4) twelve (12) month option periods
+    matches are the format matches in text if already found (scan_period_of_performance_text)
     """
-    multiplier_words_pattern = r'((((one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|fourteen|fifteen|sixteen|seventeen|eighteen|nineteen|twenty|twenty[‐–-]one|twenty[‐–-]two|twenty[‐–-]three|twenty[‐–-]four)?(\s+)?(\(?\d+\)?)?))\s*,?(\s+)?((one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|fourteen|fifteen|sixteen|seventeen|eighteen|nineteen|twenty|twenty[‐–-]one|twenty[‐–-]two|twenty[‐–-]three|twenty[‐–-]four)?(\s+)?(\(?\d+\)?)?))\s*[‐–-]*(\s+)?((days?)|(months?)|(years?))\s*((base\s*(period)?)|(option\s*(period)?)|(award(-?|\s*)terms))'
-    multiplier_words_re = re.compile(multiplier_words_pattern, re.IGNORECASE)
 
     number1_match_group = 6
     number1_second_match_group = 4
@@ -1164,11 +1539,13 @@ def scrape_pop_days_multiplier_words(periods, text, pop_lines_added, pop_lines_a
     additional_key = 'additional'
 
     periods[Document.mult_words_key] = {}
+    if matches is None:
+        matches = re.finditer(Document.multiplier_words_re, text)
 
     last_period_added = {}
 
     ## loop through regex format matches
-    for match_ind, match in enumerate(re.finditer(multiplier_words_re, text)):
+    for match_ind, match in enumerate(matches):
         
         found_period = False
 
@@ -1182,21 +1559,21 @@ def scrape_pop_days_multiplier_words(periods, text, pop_lines_added, pop_lines_a
             
         elif match.group(option_period_match_group):
             option_title = match.group(option_period_match_group)
-            logger.debug(str(option_title))
+            logger.debug('%s', option_title)
             
             period_key = options_all_key
             found_period = True
 
         elif match.group(award_term_match_group):
             award_title = match.group(award_term_match_group)
-            logger.debug(str(award_title))
+            logger.debug('%s', award_title)
             
             period_key = award_term_key
             found_period = True
 
         if found_period:
             logger.debug('found pop period!')  
-            logger.debug(str(period_key))
+            logger.debug('%s', period_key)
 
             ## existence of number1_match_group says that we need multiplier
             number1 = None
@@ -1211,13 +1588,9 @@ def scrape_pop_days_multiplier_words(periods, text, pop_lines_added, pop_lines_a
                     continue
 
             elif match.group(number1_second_match_group):
-                try:
-                    number1_str_stripped = match.group(number1_second_match_group).strip('()')
-                    number1 = w2n.word_to_num(number1_str_stripped)
-                except Exception as e:
+                number1 = word_to_num(match.group(number1_second_match_group).strip('()'))
+                if number1 is None:
                     logger.error('number ONE (word version) cannot be converted to int for: ' + str(period_key))
-                    logger.error( str(e))
-                    logger.error(type(e).__name__)
                     continue
 
             ## number2 is required for match
@@ -1233,13 +1606,9 @@ def scrape_pop_days_multiplier_words(periods, text, pop_lines_added, pop_lines_a
                     continue
 
             elif match.group(number2_second_match_group):
-                try:
-                    number2_str_stripped = match.group(number2_second_match_group).strip('()')
-                    number2 = w2n.word_to_num(number2_str_stripped)
-                except Exception as e:
+                number2 = word_to_num(match.group(number2_second_match_group).strip('()'))
+                if number2 is None:
                     logger.error('number TWO (word version) cannot be converted to int for: ' + str(period_key))
-                    logger.error( str(e))
-                    logger.error(type(e).__name__)
                     continue
 
             if number2:
@@ -1258,13 +1627,15 @@ def scrape_pop_days_multiplier_words(periods, text, pop_lines_added, pop_lines_a
                             # cumulative_text += line.get_text().replace('\n', ' ')
                             cumulative_text += line.replace('\n', ' ')
                             if not found_prev and last_period_added['text'] in cumulative_text:
-                                logger.debug('found prev')
-                                logger.debug(str(cumulative_text.encode("utf-8")))
+                                if logger.isEnabledFor(logging.DEBUG):
+                                    logger.debug('found prev')
+                                    logger.debug('%s', cumulative_text.encode("utf-8"))
                                 last_period_index_added = i
                                 found_prev = True
                             if not found_cur and match.group(0).replace('\n', ' ') in cumulative_text:
-                                logger.debug('found cur')
-                                logger.debug(str(cumulative_text.encode("utf-8")))
+                                if logger.isEnabledFor(logging.DEBUG):
+                                    logger.debug('found cur')
+                                    logger.debug('%s', cumulative_text.encode("utf-8"))
                                 curr_period_index = i
                                 found_cur = True
 
@@ -1272,9 +1643,10 @@ def scrape_pop_days_multiplier_words(periods, text, pop_lines_added, pop_lines_a
                                 break
 
                         if not found_cur or not found_prev:
-                            logger.debug(str(cumulative_text.encode("utf-8")))
-                            logger.debug('prev= ' + str(last_period_added['text'].encode("utf-8")))
-                            logger.debug('cur= ' + str(str(match.group(0)).encode("utf-8")))
+                            if logger.isEnabledFor(logging.DEBUG):
+                                logger.debug('%s', cumulative_text.encode("utf-8"))
+                                logger.debug('prev= %s', last_period_added['text'].encode("utf-8"))
+                                logger.debug('cur= %s', match.group(0).encode("utf-8"))
                             logger.error('couldnt find prev or curr pop line index: prev= ' + str(found_prev) + '; cur= ' + str(found_cur))
                             continue
                         else:
@@ -1284,7 +1656,7 @@ def scrape_pop_days_multiplier_words(periods, text, pop_lines_added, pop_lines_a
                             logger.debug('cur index is next index; add additional key')
                             period_key = additional_key
                         else:
-                            logger.debug('cur is not next line: ' +str (pop_lines_added_indices[curr_period_index] - pop_lines_added_indices[last_period_index_added]))
+                            logger.debug('cur is not next line: %s', pop_lines_added_indices[curr_period_index] - pop_lines_added_indices[last_period_index_added])
                         
                     
                 ## dont add repeated mentions throughout the doc
@@ -1333,18 +1705,21 @@ def scrape_pop_days_multiplier_words(periods, text, pop_lines_added, pop_lines_a
                     last_period_added = periods[Document.mult_words_key][period_key]
 
                 else:
-                    logger.warning('not overwriting duplicate period of performance period: ' + str(period_key))
+                    logger.warning('not overwriting duplicate period of performance period: %s', period_key)
 
     return periods
 
 
-def scrape_pop_days_catch_all(periods, text):
+def scrape_pop_days_catch_all(periods, text, matches=None):
     """
     catch all format for period of performance days extraction
     e.g. 12 months
+    matches are the format matches in the text without parens if already found (scan_period_of_performance_text)
     """
     
     periods[Document.catch_all_key] = {}
+    if matches is None:
+        matches = re.finditer(Document.length_of_time_words_re, text.replace('(','').replace(')', ''))
 
     duration_number_match_group = 2
     days_match_group = 8
@@ -1353,11 +1728,10 @@ def scrape_pop_days_catch_all(periods, text):
 
     ## add all catch all format matches
     catch_all_num = 1
-    for match_ind, match in enumerate(re.finditer(Document.length_of_time_words_pattern, text.replace('(','').replace(')', ''))):
+    for match_ind, match in enumerate(matches):
         if match.group(duration_number_match_group):
-            try:
-                duration_number = w2n.word_to_num(match.group(duration_number_match_group))
-            except:
+            duration_number = word_to_num(match.group(duration_number_match_group))
+            if duration_number is None:
                 logger.error('duration number cannot be converted to int in catch all')
                 continue
 
@@ -1394,23 +1768,103 @@ def scrape_pop_days_catch_all(periods, text):
     return periods
 
 
+def scan_period_of_performance_text(text):
+    """
+    finds the matches of every period of performance format in text, with one pass over text to tokenize it
+    no format can match across a stop character (one that isnt in any of the format patterns) or a '.' that doesnt follow a month,
+    so text is split into parts at those, and each format regex only runs over the parts that have the words it needs:
+    a unit word (days/months/years) and a period word (base/option/award) for format 1, a period word and a digit for format 2,
+    a unit word right before a period word for format 3 (e.g. months option), and a unit word for the catch all format
+    returns {format key: matches}, the same matches in the same order as re.finditer over all of the text
+    """
+
+    ## (start, end, parens before start, parens before end, has period word, has unit word right before a period word)
+    ## split at every stop, '.' and '/' - only the dates format has those
+    word_parts = []
+    ## (start, end)
+    date_parts = []
+
+    word_start = date_start = 0
+    word_parens_start = parens = 0
+    has_unit = has_word_period = has_unit_period = has_date_period = has_digit = False
+    unit_end = None
+    for token in Document.pop_scan_re.finditer(text):
+        kind = token.lastgroup
+        if kind == 'unit':
+            has_unit = True
+            unit_end = token.end()
+        elif kind == 'period':
+            has_word_period = has_date_period = True
+            ## only an s (days) and spaces can be between the unit word and the period word in format 3
+            if unit_end is not None:
+                between = text[unit_end:token.start()]
+                if between[:1] in ('s', 'S'):
+                    between = between[1:]
+                if between == '' or between.isspace():
+                    has_unit_period = True
+        elif kind == 'digit':
+            has_digit = True
+        elif kind == 'paren':
+            parens += 1
+        else:
+            position = token.start()
+            if has_unit:
+                word_parts.append((word_start, position, word_parens_start, parens, has_word_period, has_unit_period))
+            word_start = position + 1
+            word_parens_start = parens
+            has_unit = has_word_period = has_unit_period = False
+            unit_end = None
+
+            if kind == 'dot':
+                ## the dot after a month (and spaces) can be in a date (e.g. Jan. 1, 2020)
+                month_end = position
+                while month_end > 0 and text[month_end - 1].isspace():
+                    month_end -= 1
+                if Document.month_before_dot_re.search(text, max(0, month_end - 9), month_end):
+                    continue
+            elif kind == 'slash':
+                continue
+            if has_date_period and has_digit:
+                date_parts.append((date_start, position))
+            date_start = position + 1
+            has_date_period = has_digit = False
+    if has_unit:
+        word_parts.append((word_start, len(text), word_parens_start, parens, has_word_period, has_unit_period))
+    if has_date_period and has_digit:
+        date_parts.append((date_start, len(text)))
+
+    matches = {Document.duration_words_key: [], Document.dates_key: [], Document.mult_words_key: [], Document.catch_all_key: []}
+    text_without_parens = text.translate(Document.parens_table) if word_parts else text
+    for start, end, parens_start, parens_end, has_word_period, has_unit_period in word_parts:
+        if has_word_period:
+            matches[Document.duration_words_key].extend(Document.full_period_words_re.finditer(text, start, end))
+        if has_unit_period:
+            matches[Document.mult_words_key].extend(Document.multiplier_words_re.finditer(text, start, end))
+        matches[Document.catch_all_key].extend(Document.length_of_time_words_re.finditer(text_without_parens, start - parens_start, end - parens_end))
+    for start, end in date_parts:
+        matches[Document.dates_key].extend(Document.full_period_dates_re.finditer(text, start, end))
+
+    return matches
+
 def get_period_of_performance_length_of_time(text, pop_lines_added, pop_lines_added_indices, multproc_results=None):
     """
     uses formats to extract period of performance periods into a dictionary
-    calls each format extraction separately 
+    finds the matches of all formats together, then calls each format extraction separately 
     """
     try:
         periods = {}
+        pop_matches = scan_period_of_performance_text(text)
         
         ## format 1
-        periods = scrape_pop_days_duration_words(periods, text)
+        periods = scrape_pop_days_duration_words(periods, text, pop_matches[Document.duration_words_key])
         ## format 2
-        periods = scrape_pop_days_dates(periods, text)
+        periods = scrape_pop_days_dates(periods, text, pop_matches[Document.dates_key])
         ## format 3
-        periods = scrape_pop_days_multiplier_words(periods, text, pop_lines_added, pop_lines_added_indices)
+        periods = scrape_pop_days_multiplier_words(periods, text, pop_lines_added, pop_lines_added_indices, pop_matches[Document.mult_words_key])
         ## catch all format
-        periods = scrape_pop_days_catch_all(periods, text)
-        logger.debug(str(str(periods).encode("utf-8")))
+        periods = scrape_pop_days_catch_all(periods, text, pop_matches[Document.catch_all_key])
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('%s', str(periods).encode("utf-8"))
 
         if multproc_results:
             multproc_results.put(periods)
@@ -1427,6 +1881,283 @@ def get_period_of_performance_length_of_time(text, pop_lines_added, pop_lines_ad
             multproc_results.put(periods)
 
         return periods
+
+def compare_period_of_performance_scanner(texts, repeat=3):
+    """
+    differential check of scan_period_of_performance_text against running each format regex over all of the text
+    every text is one period of performance text (pop_lines_added is one line per text line)
+    logs both times, returns the texts that got different periods
+    """
+
+    different_texts = []
+    scan_time = 0.0
+    format_time = 0.0
+    for text in texts:
+        pop_lines_added = text.split('\n')
+        pop_lines_added_indices = list(range(len(pop_lines_added)))
+
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            format_periods = {}
+            format_periods = scrape_pop_days_duration_words(format_periods, text)
+            format_periods = scrape_pop_days_dates(format_periods, text)
+            format_periods = scrape_pop_days_multiplier_words(format_periods, text, pop_lines_added, pop_lines_added_indices)
+            format_periods = scrape_pop_days_catch_all(format_periods, text)
+            format_time += time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            scan_periods = get_period_of_performance_length_of_time(text, pop_lines_added, pop_lines_added_indices)
+            scan_time += time.perf_counter() - start_time
+
+        if scan_periods != format_periods:
+            logger.error('period of performance scanner found different periods for: ' + str(text.encode("utf-8")))
+            different_texts.append(text)
+
+    logger.info('period of performance formats over ' + str(len(texts)) + ' texts: ' + str(round(format_time, 3)) + 's, scanner: ' + str(round(scan_time, 3)) + 's')
+    return different_texts
+
+def benchmark_pop_patterns(corpus=('option period 4: 12 months', 'Option Period One (1): twelve (12) months', 'base period: 01/01/2020 - 12/31/2020',
+                                   'option period 1: July 1, 2020 - July 1, 2023', 'Base Period: Jan. 1st, 2020 through Dec 31, 2020', 'award term 2 - 6 months',
+                                   'four (4) twelve (12) month option periods', 'one 12-month base period and four 12-month option periods', '90 days after award',
+                                   'option 1: Jan. 2020\t 01/02/2021', 'optional 124 months base period'),
+                           kb=4, run_lengths=(64, 256, 1024)):
+    """
+    fuzz benchmark of the period of performance regexes
+    builds adversarial text kb KB long for every shape (runs of spaces, dashes, digits, day names that the regexes can split many ways) and every run length, and logs the time per KB of every compiled regex
+    a regex that is linear in the run length takes about the same time per KB for every run length, one that is quadratic takes run_lengths[-1] / run_lengths[0] times longer on the longest runs
+    checks that the compiled regexes find the same matches as the patterns as written (without linear_runs) on the corpus of period of performance lines
+    the patterns as written are only run on the corpus, on the adversarial text they can run for minutes
+    returns ({regex name: worst ms per KB}, {regex name: worst growth of the ms per KB from the shortest to the longest runs}, [(regex name, corpus text) with different matches])
+    """
+
+    compiled_regexes = {Document.duration_words_key: Document.full_period_words_re, Document.dates_key: Document.full_period_dates_re,
+                        Document.mult_words_key: Document.multiplier_words_re, Document.catch_all_key: Document.length_of_time_words_re, 'pop_line': POP_LINE_RE}
+    written_regexes = {Document.duration_words_key: re.compile(Document.full_pattern_words, re.IGNORECASE), Document.dates_key: re.compile(Document.full_pattern_dates, re.IGNORECASE),
+                       Document.mult_words_key: re.compile(Document.multiplier_words_pattern, re.IGNORECASE), Document.catch_all_key: re.compile(Document.length_of_time_words_pattern)}
+
+    ## whitespace only groups are left out, linear_runs can move whitespace between the (\s+) groups
+    def match_key(match):
+        return match.span(), tuple(group if group and group.strip() else '' for group in match.groups())
+
+    different_matches = []
+    for name, written_regex in written_regexes.items():
+        for text in corpus:
+            if [match_key(match) for match in written_regex.finditer(text)] != [match_key(match) for match in compiled_regexes[name].finditer(text)]:
+                logger.error(name + ' regex finds different matches than the pattern as written in: ' + text)
+                different_matches.append((name, text))
+
+    def shapes(run_length):
+        return {'spaces after option': 'option' + ' ' * run_length + 'x;',
+                'spaces after number': 'twelve' + ' ' * run_length + 'x;',
+                'spaces and dashes': '12 ' + ' ' * run_length + '-' * run_length + 'x;',
+                'spaces after date': 'option 1: Jan 1, 2020' + ' ' * run_length + 'x;',
+                'spaces after month': 'on Jan' + ' ' * run_length + ';',
+                'words after option': 'option ' + 'a ' * run_length + ';',
+                'digits': '1' * run_length + ' x;',
+                'digits in parens': '(' + '1' * run_length + ') x;',
+                'day names': 'mon' * run_length + 'x;'}
+
+    worst_times = {name: 0.0 for name in compiled_regexes}
+    worst_growths = {name: 0.0 for name in compiled_regexes}
+    for shape_name in shapes(1):
+        for name, compiled_regex in compiled_regexes.items():
+            times = []
+            for run_length in run_lengths:
+                shape = shapes(run_length)[shape_name]
+                text = shape * (kb * 1024 // len(shape) + 1)
+                start_time = time.perf_counter()
+                for match in compiled_regex.finditer(text):
+                    pass
+                times.append((time.perf_counter() - start_time) * 1000 / (len(text) / 1024))
+            worst_times[name] = max(worst_times[name], max(times))
+            ## the shortest runs are timed too, a growth over ~1 is time that grows faster than the run length
+            worst_growths[name] = max(worst_growths[name], times[-1] / max(times[0], 0.001))
+            logger.info(name + ' regex on ' + shape_name + ': ' + ' / '.join(str(round(ms_per_kb, 3)) for ms_per_kb in times) + ' ms/KB for runs of ' + ' / '.join(str(run_length) for run_length in run_lengths))
+
+    return worst_times, worst_growths, different_matches
+
+def benchmark_pop_date_parsing(pop_texts, repeat=3):
+    """
+    compares parse_pop_date to dateutil.parser.parse on the dates the dates format finds in the period of performance texts
+    logs the dates per second of both (parse_pop_date with an empty cache and with every date cached) and every date they parse differently
+    returns ({parser name: dates per second}, [date texts parsed differently])
+    """
+
+    date_texts = []
+    for text in pop_texts:
+        for match in Document.full_period_dates_re.finditer(text):
+            date_texts.extend([match.group(Document.date1_match_group), match.group(Document.date2_match_group)])
+    if not date_texts:
+        logger.warning('no dates found to benchmark')
+        return {}, []
+
+    def dateutil_parse(date_text):
+        try:
+            return dateutil.parser.parse(date_text)
+        except Exception:
+            return None
+
+    different_dates = [date_text for date_text in set(date_texts) if parse_pop_date(date_text) != dateutil_parse(date_text)]
+    for date_text in different_dates:
+        logger.error('parse_pop_date and dateutil parse date differently: ' + date_text)
+
+    times = {'dateutil': [], 'parse_pop_date': [], 'parse_pop_date (cached)': []}
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for date_text in date_texts:
+            dateutil_parse(date_text)
+        times['dateutil'].append(time.perf_counter() - start_time)
+
+        parse_pop_date.cache_clear()
+        start_time = time.perf_counter()
+        for date_text in date_texts:
+            parse_pop_date(date_text)
+        times['parse_pop_date'].append(time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        for date_text in date_texts:
+            parse_pop_date(date_text)
+        times['parse_pop_date (cached)'].append(time.perf_counter() - start_time)
+
+    dates_per_second = {parser_name: len(date_texts) / min(parser_times) for parser_name, parser_times in times.items()}
+    for parser_name, parser_dates_per_second in dates_per_second.items():
+        logger.info(parser_name + ': ' + str(round(parser_dates_per_second)) + ' dates/s')
+
+    return dates_per_second, different_dates
+
+## result of run_in_worker_processes (e.g. the periods returned by extract_periods_of_performance) for a task that took longer than the timeout
+POP_TIMEOUT = 'TIMEOUT'
+
+def task_worker(connection, function=get_period_of_performance_length_of_time):
+    """
+    worker process for run_in_worker_processes
+    gets tasks (the args of function) and sends back what function returns, until it gets None
+    """
+
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+        connection.send(function(*task))
+    connection.close()
+
+def start_worker(function=get_period_of_performance_length_of_time):
+    """
+    starts a task_worker process for run_in_worker_processes
+    returns (process, connection to it)
+    """
+
+    parent_connection, child_connection = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=task_worker, args=(child_connection, function), daemon=True)
+    process.start()
+    child_connection.close()
+    return process, parent_connection
+
+def run_in_worker_processes(tasks, function=get_period_of_performance_length_of_time, processes=None, timeout=60.0, tasks_per_worker=100, failed_result=None):
+    """
+    runs function over a pool of up to processes worker processes
+    tasks: (key, args of function) pairs; it can be a generator, the next task is taken while the workers run the ones they have (so making a task overlaps them)
+    a task that takes longer than timeout seconds from when its worker got it gets POP_TIMEOUT, and its worker is killed and replaced
+    a task whose worker dies gets failed_result
+    every worker is replaced after tasks_per_worker tasks so memory doesnt grow
+    each worker has its own pipe, so killing one doesnt break the others
+    returns {key: result} in the order the tasks were taken
+    """
+
+    tasks = iter(tasks)
+    processes = max(1, processes or os.cpu_count() or 1)
+    results = {}
+    ## the next (key, args), taken before a worker is free for it
+    next_task = None
+    tasks_left = True
+
+    ## worker connection -> [process, key of its task, start time, tasks done]
+    workers = {}
+
+    def stop_worker(connection, kill=False):
+        process = workers.pop(connection)[0]
+        if kill:
+            process.terminate()
+        else:
+            try:
+                connection.send(None)
+            except (OSError, EOFError):
+                pass
+        process.join()
+        connection.close()
+
+    while True:
+        if next_task is None and tasks_left:
+            next_task = next(tasks, None)
+            tasks_left = next_task is not None
+
+        ## give the next task to an idle worker, or to a new one if there are less than processes
+        if next_task is not None:
+            idle_connections = [connection for connection, worker in workers.items() if worker[1] is None]
+            if idle_connections or len(workers) < processes:
+                if idle_connections:
+                    connection = idle_connections[0]
+                else:
+                    process, connection = start_worker(function)
+                    workers[connection] = [process, None, None, 0]
+                key, args = next_task
+                connection.send(args)
+                workers[connection][1:3] = [key, time.perf_counter()]
+                results[key] = None
+                next_task = None
+                continue
+
+        running_workers = [worker for worker in workers.values() if worker[1] is not None]
+        if not running_workers:
+            break
+
+        ## dont wait if there is a task to take, else wait for a result or until the oldest running task times out
+        if next_task is None and tasks_left:
+            wait_time = 0.0
+        else:
+            wait_time = max(0.0, min(worker[2] + timeout for worker in running_workers) - time.perf_counter())
+        ready_connections = multiprocessing.connection.wait(list(workers), timeout=wait_time)
+
+        for connection in ready_connections:
+            worker = workers[connection]
+            try:
+                result = connection.recv()
+            except (OSError, EOFError):
+                if worker[1] is not None:
+                    logger.error('worker died on: ' + str(worker[1]))
+                    results[worker[1]] = failed_result
+                stop_worker(connection, kill=True)
+                continue
+            results[worker[1]] = result
+            worker[1] = None
+            worker[3] += 1
+            if worker[3] >= tasks_per_worker:
+                stop_worker(connection)
+
+        now = time.perf_counter()
+        for connection, worker in list(workers.items()):
+            if worker[1] is not None and now - worker[2] > timeout:
+                logger.error('timed out after ' + str(timeout) + 's on: ' + str(worker[1]))
+                results[worker[1]] = POP_TIMEOUT
+                stop_worker(connection, kill=True)
+
+    for connection in list(workers):
+        stop_worker(connection)
+
+    return results
+
+def extract_periods_of_performance(pop_tasks, processes=None, timeout=60.0, tasks_per_worker=100):
+    """
+    get_period_of_performance_length_of_time for many documents over a pool of worker processes (run_in_worker_processes)
+    pop_tasks: (doc_id, pop_text, pop_lines_added, pop_lines_added_indices) for every document, pop_lines_added are the line texts
+    a document that takes longer than timeout seconds (e.g. a regex backtracking forever) gets POP_TIMEOUT, and its worker is killed and replaced
+    returns {doc_id: periods or POP_TIMEOUT} in the order of pop_tasks
+    """
+
+    pop_tasks = list(pop_tasks)
+    processes = max(1, min(processes or os.cpu_count() or 1, len(pop_tasks)))
+    return run_in_worker_processes(((doc_id, (pop_text, pop_lines_added, pop_lines_added_indices)) for doc_id, pop_text, pop_lines_added, pop_lines_added_indices in pop_tasks),
+                                   function=get_period_of_performance_length_of_time, processes=processes, timeout=timeout, tasks_per_worker=tasks_per_worker, failed_result={})
                         
 def get_total_period_of_performance_days(pop_dict):
     """
@@ -1556,112 +2287,147 @@ def get_total_period_of_performance_days(pop_dict):
     return days
 
 
+## period of performance lines: a time word (case sensitive) or a date, in one regex
+## named groups say which one matched first
+## the month date only matches the same lines as ((Mon|...)[a-z]*)*, (\d|\d{2})*, (\d|\d{2}|\d{4})* and (\d{2}|\d{4})* did,
+## those could split a run of digits or letters in exponentially many ways
+## the first [\ ,-]* takes its whole run, and the ([\ ,]) run after the month can only start where [\ ,]* couldnt have gone on,
+## so a run of spaces isnt split between two of them (the same lines and spans match)
+POP_LINE_RE = re.compile(r'(?P<time_word>month|day|year)'
+                         r'|(?P<date>\b(\d{2}|\d)[\/-](\d{2}|\d)[\/-]?(\d{4}|\d{2})|(\d{4}|\d{2})[\/-](\d{2}|\d)[\/-](\d|\d{2})\b'
+                         r'|(?i:\b((Mon|Tue|Wed|Thu|Fri|Sat|Sun)[a-z]*)?[\ ,-]*(?![\ ,-])(\d*)(st|nd|rd|th)*[\ ,-]*(Jan(uary)?|Feb(ruary)?|Mar(ch)?|May|Apr(il)?|Jul(y)|Jun(e)?|Aug(ust)?|Oct(ober)|Sep(tember)?|Nov(ember)?|Dec(ember)?)[\ ,]*(\d*)(st|nd|rd|th)*(?:(?<![\ ,])([\ ,])+)?\'*((\d{2})*)\b)'
+                         r'|\b(19|20)[0-9]{2}\b)')
+## lines added without the line before them: option or base (option period 1, base period, ...)
+POP_ADDITIONAL_LINE_RE = re.compile(r'option|base', re.IGNORECASE)
+
 def extract_period_of_performance(pop_topic):
     """
     first pass clean of period of performance topic
     looks for dates, durations, and periods
+    every line is searched once with POP_LINE_RE (and POP_ADDITIONAL_LINE_RE if that doesnt match), and its text is read once
+    lines already added are kept by index, and by text for lines that are different elements with the same markup (e.g. a header on every page)
     """
 
     logger.debug('extracting period of performance from period of performance topic')
 
     lines = pop_topic.line_elements
     line_indices = pop_topic.line_element_indices
+    line_texts = [line.get_text() for line in lines]
+    ## checked once, not for every line
+    trace = logger.isEnabledFor(TRACE)
+    debug = logger.isEnabledFor(logging.DEBUG)
 
-    pop_time_words = ['month','day','year']
-    date_regexes = []
-    
-    date_regexes.append(re.compile( r'\b(\d{2}|\d)[\/-](\d{2}|\d)[\/-]?(\d{4}|\d{2})|(\d{4}|\d{2})[\/-](\d{2}|\d)[\/-](\d|\d{2})\b'))
-    date_regexes.append(re.compile( r'\b((Mon|Tue|Wed|Thu|Fri|Sat|Sun)[a-z]*)*[\ ,-]*(\d|\d{2})*(st|nd|rd|th)*[\ ,-]*(Jan(uary)?|Feb(ruary)?|Mar(ch)?|May|Apr(il)?|Jul(y)|Jun(e)?|Aug(ust)?|Oct(ober)|Sep(tember)?|Nov(ember)?|Dec(ember)?)[\ ,]*(\d|\d{2}|\d{4})*(st|nd|rd|th)*([\ ,])*\'*(\d{2}|\d{4})*\b', re.IGNORECASE))
-    date_regexes.append(re.compile( r'\b(19|20)[0-9]{2}\b'))
-
-    period_pattern = r'((option\s*(period)\s*((\d+)|(one|two|three|four|five|six|seven|eight|nine|ten))*)|(base\s*(period)))'
-    period_re = re.compile(period_pattern, re.IGNORECASE)
+    pop_text = []
+    has_pop_text = False
+    lines_added=[]
+    lines_added_indices = []
+    ## indices (in lines) of the lines added, and text -> lines added with that text
+    ## bs4 elements are equal when their markup is, and equal elements have the same text
+    added_line_numbers = set()
+    lines_added_by_text = {}
 
-    additional_pattern_1 = r'option'
-    addition_re_1 = re.compile(additional_pattern_1, re.IGNORECASE)
+    ## line_number can be -1 (the line before the first line is the last line)
+    def is_added(line_number):
+        return line_number % len(lines) in added_line_numbers or lines[line_number] in lines_added_by_text.get(line_texts[line_number], ())
 
-    additional_pattern_2 = r'base'
-    addition_re_2 = re.compile(additional_pattern_2, re.IGNORECASE)
-    
-    pop_regexes = []
-    pop_text = ''
-    for word in pop_time_words:
-        new_regex = re.compile(word +'s?')
-        pop_regexes.append(new_regex)
+    def add_line(line_number):
+        added_line_numbers.add(line_number % len(lines))
+        lines_added_by_text.setdefault(line_texts[line_number], []).append(lines[line_number])
+        lines_added.append(lines[line_number])
+        lines_added_indices.append(line_indices[line_number])
 
-    lines_added=[]
-    lines_added_indices = []
     for line_index, line in enumerate(lines):
-        logger.warning(str(line_indices[line_index]) + ': ' + str(line.get_text().encode("utf-8")))
-        # logger.warning()
-        text=line.get_text()
-        for pop_regex in pop_regexes:
-            if re.search(pop_regex, text):
-                if line not in lines_added:
-                    if pop_text != '':
-                        pop_text += '\n'
-                    try:
-                        if (lines[line_index - 1] not in lines_added) \
-                            and (line_indices[line_index-1] == line_indices[line_index] - 1): ## this ensures that the lines actually come directly before the line being added in the document
-                            
-                            logger.debug('adding line before: ' + str(lines[line_index - 1].get_text().encode("utf-8")))
-                            pop_text += lines[line_index - 1].get_text() 
-                            pop_text += ' '
-                            lines_added.append(lines[line_index - 1])
-                            lines_added_indices.append(line_indices[line_index-1])
-
-                    except (IndexError):
-                        logger.warning('could not grab text before pop regex match: ' + str(text.encode("utf-8")))
-                    
-                    logger.debug('adding line: ' + str(text.encode("utf-8")))
-                    pop_text += text
-                    lines_added.append(line)
-                    lines_added_indices.append(line_indices[line_index])
-
-        for date_regex in date_regexes:
-            if re.search(date_regex, text):
-                if line not in lines_added:
-                    if pop_text != '':
-                        pop_text += '\n'
-                    try:
-                        if (lines[line_index - 1] not in lines_added) \
-                            and (line_indices[line_index-1] == line_indices[line_index] - 1): ## this ensures that the lines actually come directly before the line being added in the document
-                            
-                            logger.debug('adding line before: ' + str(lines[line_index - 1].get_text().encode("utf-8")))
-                            pop_text += lines[line_index - 1].get_text() 
-                            pop_text += ' '
-                            lines_added.append(lines[line_index - 1])
-                            lines_added_indices.append(line_indices[line_index-1])
-
-                    except (IndexError):
-                        logger.warning('could not grab text before date: ' + text)
-                    
-                    logger.debug('adding line: ' + str(text))
-                    pop_text += text
-                    lines_added.append(line)
-                    lines_added_indices.append(line_indices[line_index])
-
-        add_line_additional_search = False
-        if line not in lines_added:
-            if re.search(period_re, text):
-                add_line_additional_search = True
-
-            elif re.search(addition_re_1, text):
-                add_line_additional_search = True
-
-            elif re.search(addition_re_2, text):
-                add_line_additional_search = True
-
-            if add_line_additional_search:
-                if pop_text != '':
-                    pop_text += '\n'
-                logger.debug('adding line from additional regex match: ' + str(text))
-                pop_text += text
-                lines_added.append(line)
-                lines_added_indices.append(line_indices[line_index])
+        text = line_texts[line_index]
+        if trace:
+            logger.log(TRACE, '%s: %s', line_indices[line_index], text.encode("utf-8"))
+        if is_added(line_index):
+            continue
 
-                   
-    return pop_text, lines_added, lines_added_indices
+        line_match = POP_LINE_RE.search(text)
+        if line_match:
+            if has_pop_text:
+                pop_text.append('\n')
+            try:
+                if (not is_added(line_index - 1)) \
+                    and (line_indices[line_index-1] == line_indices[line_index] - 1): ## this ensures that the lines actually come directly before the line being added in the document
+
+                    if debug:
+                        logger.debug('adding line before: %s', line_texts[line_index - 1].encode("utf-8"))
+                    pop_text.append(line_texts[line_index - 1])
+                    pop_text.append(' ')
+                    has_pop_text = True
+                    add_line(line_index - 1)
+
+            except (IndexError):
+                if line_match.lastgroup == 'time_word':
+                    logger.warning('could not grab text before pop regex match: ' + str(text.encode("utf-8")))
+                else:
+                    logger.warning('could not grab text before date: ' + text)
+
+            if debug:
+                logger.debug('adding line: %s', text.encode("utf-8") if line_match.lastgroup == 'time_word' else text)
+            pop_text.append(text)
+            has_pop_text = has_pop_text or text != ''
+            add_line(line_index)
+
+        elif POP_ADDITIONAL_LINE_RE.search(text):
+            if has_pop_text:
+                pop_text.append('\n')
+            logger.debug('adding line from additional regex match: %s', text)
+            pop_text.append(text)
+            has_pop_text = has_pop_text or text != ''
+            add_line(line_index)
+
+    return ''.join(pop_text), lines_added, lines_added_indices
+
+@functools.lru_cache(maxsize=None)
+def get_sentencizer():
+    """
+    returns the spacy pipeline used to count sentences; it's built once per process
+    """
+
+    nlp = spacy.lang.en.English()
+    nlp.add_pipe(nlp.create_pipe('sentencizer'))
+    return nlp
+
+class SentenceCounter:
+    """
+    counts the sentences of a text that only grows at the end (like text_to_summarize) without sentencizing all of it every time
+    the end of the text, from the start of its last sentence, is kept and sentencized again together with the new text
+    the sentencizer starts a new sentence at the same tokens as when sentencizing the whole text, so the count is the same
+    """
+
+    def __init__(self):
+        self.text_length = 0
+        self.tail = ''
+        self.sentences_before_tail = 0
+        self.num_sentences = 0
+
+    def count(self, text):
+        """
+        returns the number of sentences in text; text has to be the text of the last call with more text added to the end
+        """
+
+        ## text was replaced instead of added to - start over
+        if len(text) < self.text_length:
+            self.__init__()
+
+        tail_text = self.tail + text[self.text_length:]
+        sentences = list(get_sentencizer()(tail_text).sents)
+        self.num_sentences = self.sentences_before_tail + len(sentences)
+
+        ## keep the text from the last sentence that starts after whitespace, so the tokens of the tail are the same as in the whole text
+        keep_index = len(sentences) - 1
+        while keep_index > 0 and not tail_text[sentences[keep_index].start_char - 1].isspace():
+            keep_index -= 1
+        if keep_index > 0:
+            self.sentences_before_tail += keep_index
+            self.tail = tail_text[sentences[keep_index].start_char:]
+        else:
+            self.tail = tail_text
+        self.text_length = len(text)
+
+        return self.num_sentences
 
 def parse_text_for_summary(document, cutoff_num_sentences):
     """
@@ -1670,52 +2436,99 @@ def parse_text_for_summary(document, cutoff_num_sentences):
     
     section_to_add_index = 0
     keep_adding_text = True
+    sentence_counter = SentenceCounter()
     while keep_adding_text:
         # num_words_to_summarize = len(re.findall(r'[a-zA-Z]\w*', document.text_to_summarize))
-        nlp = spacy.lang.en.English()
-        nlp.add_pipe(nlp.create_pipe('sentencizer'))
-        logger.debug('text to summarize so far: ' + str(str([document.text_to_summarize]).encode("utf-8")))
-        nlp_doc = nlp(document.text_to_summarize)
-        num_sentences_to_summarize = len(list(nlp_doc.sents))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('text to summarize so far: %s', str([document.text_to_summarize]).encode("utf-8"))
+        ## only the text added since the last loop is sentencized
+        num_sentences_to_summarize = sentence_counter.count(document.text_to_summarize)
 
         # if ( num_words_to_summarize <= config.CUTOFF_NUM_WORDS_PRE_SUMMARY):
         if (num_sentences_to_summarize <= cutoff_num_sentences):
             # logger.debug('text_to_summarize num words <= config.CUTTOFF: ' + str(num_words_to_summarize) + '<=' + str(config.CUTOFF_NUM_WORDS_PRE_SUMMARY))
-            logger.debug('text_to_summarize num sentences <= config.CUTTOFF: ' + str(num_sentences_to_summarize) + '<=' + str(cutoff_num_sentences))
+            logger.debug('text_to_summarize num sentences <= config.CUTTOFF: %s<=%s', num_sentences_to_summarize, cutoff_num_sentences)
 
             if section_to_add_index < len(document.sections_to_summarize_by_priority):
-                logger.debug('section_to_add_index < len(sections_to_add): '+ str(section_to_add_index) + '<' + str(len(document.sections_to_summarize_by_priority)))
-                logger.debug('attempting to add ' + str(document.sections_to_summarize_by_priority[section_to_add_index]))
+                logger.debug('section_to_add_index < len(sections_to_add): %s<%s', section_to_add_index, len(document.sections_to_summarize_by_priority))
+                logger.debug('attempting to add %s', document.sections_to_summarize_by_priority[section_to_add_index])
                 text_added = document.add_text_to_summarize(document.topics_dict[document.sections_to_summarize_by_priority[section_to_add_index]])
                 if not text_added:
                     logger.debug('could not add topic text because topic text is empty string')
                 section_to_add_index += 1
             ## this means we do not have enough text to summarize AND we are out of sections to add; therefore, add entire doc
             else:
-                logger.debug('section_to_add_index >= len(sections_to_add): '+ str(section_to_add_index) + '>=' + str(len(document.sections_to_summarize_by_priority)))
+                logger.debug('section_to_add_index >= len(sections_to_add): %s>=%s', section_to_add_index, len(document.sections_to_summarize_by_priority))
                 logger.debug('adding ALL TEXT')
                 all_text_topic = Topic('ALLTEXT')
-                all_text_topic.text = document.all_text
 
                 ###############################################################################################
                 # ## DONT INCLUDE TEXT THAT IS ALREADY BEING ADDED TO TEXT TO SUMMARIZE
+                ## the Sections and custom lines of the topics are removed from all text by their spans in it, with every other Section or line with the same text
+                ## a text that isnt found at a span (e.g. a custom line with a •, all text has a . for it) is searched for in all text
+                repeated_section_texts = set()
+                repeated_line_texts = set()
                 for topic_name in  document.sections_to_summarize_by_priority:
-                    for section_ind, section in enumerate(document.topics_dict[topic_name].sections):
-                        if section.text in all_text_topic.text:
-                            all_text_topic.text = all_text_topic.text.replace(section.text, '')
-                            logger.debug('REMOVE REPEATED SECTION TEXT in SECTION ' + str (section_ind) + ' OF TOPIC ' + str(topic_name) + ' FROM ALLTEXT TOPIC:: ' + str(section.text))
-                    for custom_line in document.topics_dict[topic_name].custom_line_elements_added:
-                        if custom_line.text in all_text_topic.text:
-                            all_text_topic.text = all_text_topic.text.replace(custom_line.text, '')
-                            logger.debug('REMOVE REPEATED CUSTOM LINE TEXT OF TOPIC ' + str(topic_name) + ' FROM ALLTEXT TOPIC:: ' + str (custom_line.text))
+                    repeated_section_texts.update(section.text for section in document.topics_dict[topic_name].sections)
+                    repeated_line_texts.update(custom_line.text for custom_line in document.topics_dict[topic_name].custom_line_elements_added)
+                logger.debug('REMOVE %s REPEATED SECTION AND CUSTOM LINE TEXTS FROM ALLTEXT TOPIC', len(repeated_section_texts) + len(repeated_line_texts))
+
+                all_text = document.all_text
+                spans = []
+                found_texts = set()
+                for section in document.sections:
+                    if section.text in repeated_section_texts:
+                        span = document.get_all_text_span(section)
+                        if span is not None:
+                            spans.append(span)
+                            found_texts.add(section.text)
+                for span in document.all_text_line_spans.values():
+                    line_text = all_text[span[0]:span[1]]
+                    if line_text in repeated_line_texts:
+                        spans.append(span)
+                        found_texts.add(line_text)
+                spans.extend(find_text_spans(all_text, (repeated_section_texts | repeated_line_texts) - found_texts))
+                all_text_topic.text = remove_spans(all_text, spans)
                 ###############################################################################################
                 document.add_text_to_summarize(all_text_topic)
                 keep_adding_text = False      
         else:
             # logger.debug('text_to_summarize num words > config.CUTTOFF: ' + str(num_words_to_summarize) + '>' + str(config.CUTOFF_NUM_WORDS_PRE_SUMMARY))
-            logger.debug('text_to_summarize num sentences > config.CUTTOFF: ' + str(num_sentences_to_summarize) + '>' + str(cutoff_num_sentences))
+            logger.debug('text_to_summarize num sentences > config.CUTTOFF: %s>%s', num_sentences_to_summarize, cutoff_num_sentences)
             keep_adding_text = False
 
+def benchmark_logging(input_file_path, cutoff_num_sentences=20, log_levels=(logging.INFO, logging.DEBUG, TRACE), repeat=3):
+    """
+    times one .parsed.html file through parse_html, the period of performance and parse_text_for_summary with the logger of this module at each level
+    the records are dropped (not output), so the time is what building them costs; at INFO the guarded debug/trace logging costs nothing
+    returns {log level name: best time in seconds}
+    """
+
+    timings = {}
+    level, handlers, propagate = logger.level, logger.handlers, logger.propagate
+    logger.handlers, logger.propagate = [logging.NullHandler()], False
+    try:
+        for log_level in log_levels:
+            logger.setLevel(log_level)
+            best_time = None
+            for _ in range(repeat):
+                start_time = time.perf_counter()
+                document = parse_html(doc_id=None, input_base_name=os.path.basename(input_file_path), input_file_path=input_file_path)
+                pop_text, pop_lines_added, pop_lines_added_indices = extract_period_of_performance(document.topics_dict['PERIOD OF PERFORMANCE:'])
+                get_period_of_performance_length_of_time(pop_text, [line.get_text() for line in pop_lines_added], pop_lines_added_indices)
+                parse_text_for_summary(document, cutoff_num_sentences)
+                elapsed_time = time.perf_counter() - start_time
+                if best_time is None or elapsed_time < best_time:
+                    best_time = elapsed_time
+            timings[logging.getLevelName(log_level)] = best_time
+    finally:
+        logger.setLevel(level)
+        logger.handlers, logger.propagate = handlers, propagate
+
+    for level_name, best_time in timings.items():
+        logger.info('document at ' + level_name + ': ' + str(round(best_time, 3)) + 's')
+    return timings
+
 def parse_pdf_file(input_file_path, reportables_file_path, clause_depth=3, font_adjust_percentage=0.8, use_left_indent=True):
     """
     calls ContractBot to parse the pdf file
@@ -1751,6 +2564,110 @@ def parse_pdf_file(input_file_path, reportables_file_path, clause_depth=3, font_
     parsed_file_path = input_file_path + ".parsed.html"
     return parsed_file_path
 
+def canned_pdf_converter(canned_parsed_html_file_path):
+    """
+    returns a stand-in for parse_pdf_file that doesnt need pdfprocessor (e.g. to run process_pdf_folder without ContractBot)
+    it writes a copy of the canned .parsed.html file next to every pdf, where ContractBot would write it
+    """
+
+    def convert_pdf_file(input_file_path, reportables_file_path, **kwargs):
+        parsed_file_path = input_file_path + ".parsed.html"
+        shutil.copyfile(canned_parsed_html_file_path, parsed_file_path)
+        return parsed_file_path
+
+    return convert_pdf_file
+
+## columns of the process_pdf_folder results table
+RESULTS_TABLE_COLUMNS = ['doc_id', 'name', 'status', 'pop_days', 'summary_topics', 'summary_chars', 'convert_s', 'process_s', 'error']
+
+def process_parsed_html(doc_id, parsed_html_file_path, cutoff_num_sentences=20, html_parser='html.parser'):
+    """
+    worker for process_pdf_folder: parse_html, period of performance and summary of one converted document
+    returns its row of the results table; an error only fails this document
+    """
+
+    row = {'status': 'ok', 'error': ''}
+    start_time = time.perf_counter()
+    try:
+        document = parse_html(doc_id=doc_id, input_base_name=os.path.basename(parsed_html_file_path), input_file_path=parsed_html_file_path, html_parser=html_parser)
+
+        pop_text, pop_lines_added, pop_lines_added_indices = extract_period_of_performance(document.topics_dict['PERIOD OF PERFORMANCE:'])
+        periods = get_period_of_performance_length_of_time(pop_text, [line.get_text() for line in pop_lines_added], pop_lines_added_indices)
+        row['pop_days'] = get_total_period_of_performance_days(periods) if periods else ''
+
+        parse_text_for_summary(document, cutoff_num_sentences)
+        row['summary_topics'] = ', '.join(document.text_to_summarize_name_list)
+        row['summary_chars'] = len(document.text_to_summarize)
+    except Exception as e:
+        logger.error('could not process doc: ' + str(doc_id))
+        logger.error(type(e).__name__)
+        logger.error(str(e))
+        row['status'] = 'error'
+        row['error'] = type(e).__name__ + ': ' + str(e)
+    row['process_s'] = round(time.perf_counter() - start_time, 3)
+    return row
+
+def format_results_table(rows, columns=RESULTS_TABLE_COLUMNS):
+    """
+    returns the rows of process_pdf_folder as a text table, one line per document
+    """
+
+    widths = [max([len(column)] + [len(str(row.get(column, ''))) for row in rows]) for column in columns]
+    lines = ['  '.join(column.ljust(width) for column, width in zip(columns, widths)).rstrip()]
+    lines.append('  '.join('-' * width for width in widths))
+    for row in rows:
+        lines.append('  '.join(str(row.get(column, '')).ljust(width) for column, width in zip(columns, widths)).rstrip())
+    return '\n'.join(lines)
+
+def process_pdf_folder(input_dir, reportables_file_path, results_file_path=None, convert_pdf_file=parse_pdf_file, processes=None, timeout=600.0, tasks_per_worker=20,
+                       cutoff_num_sentences=20, html_parser='html.parser', **convert_kwargs):
+    """
+    runs every pdf in input_dir through the whole pipeline: parse_pdf_file -> parse_html -> period of performance -> parse_text_for_summary
+    pdfs are converted one at a time in this process (ContractBot), and every converted doc is parsed in a pool of worker processes (run_in_worker_processes) while the next one converts
+    convert_pdf_file is parse_pdf_file, or a stand-in like canned_pdf_converter; convert_kwargs go to it (e.g. clause_depth)
+    an error in a doc (converting or parsing) or a doc taking longer than timeout seconds to parse only fails that doc, its worker is killed and replaced
+    writes the results table to results_file_path (csv) if given, and logs it
+    returns the rows of the results table (RESULTS_TABLE_COLUMNS) in the order of the pdfs
+    """
+
+    pdf_file_paths = sorted(os.path.join(input_dir, file_name) for file_name in os.listdir(input_dir) if file_name.lower().endswith('.pdf'))
+    rows = [{'doc_id': doc_id, 'name': os.path.basename(pdf_file_path)} for doc_id, pdf_file_path in enumerate(pdf_file_paths)]
+
+    ## converts the pdfs one at a time, each is taken by run_in_worker_processes while the workers parse the ones before it
+    def parse_tasks():
+        for row, pdf_file_path in zip(rows, pdf_file_paths):
+            start_time = time.perf_counter()
+            try:
+                parsed_html_file_path = convert_pdf_file(pdf_file_path, reportables_file_path, **convert_kwargs)
+            except Exception as e:
+                logger.error('could not convert pdf: ' + str(pdf_file_path))
+                logger.error(type(e).__name__)
+                logger.error(str(e))
+                row.update({'status': 'convert error', 'error': type(e).__name__ + ': ' + str(e)})
+                continue
+            finally:
+                row['convert_s'] = round(time.perf_counter() - start_time, 3)
+            yield row['doc_id'], (row['doc_id'], parsed_html_file_path, cutoff_num_sentences, html_parser)
+
+    processes = max(1, min(processes or os.cpu_count() or 1, len(pdf_file_paths)))
+    results = run_in_worker_processes(parse_tasks(), function=process_parsed_html, processes=processes, timeout=timeout, tasks_per_worker=tasks_per_worker)
+    for doc_id, result in results.items():
+        if result == POP_TIMEOUT:
+            rows[doc_id].update({'status': 'timeout', 'error': 'no result after ' + str(timeout) + 's'})
+        elif result is None:
+            rows[doc_id].update({'status': 'error', 'error': 'worker process died'})
+        else:
+            rows[doc_id].update(result)
+
+    if results_file_path:
+        with open(results_file_path, 'w', newline='', encoding='utf-8') as results_file:
+            writer = csv.DictWriter(results_file, fieldnames=RESULTS_TABLE_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+    logger.info('processed ' + str(len(rows)) + ' pdfs in ' + str(input_dir) + ':\n' + format_results_table(rows))
+
+    return rows
+
 # def parse_pdf_file(input_file_path, reportables_file_path, clause_depth=3, font_adjust_percentage=0.8, use_left_indent=True):
 
 #     config = pdfprocessor.get_pdf_config(clause_depth = clause_depth, 
@@ -11,6 +11,43 @@ import PyPDF2
 # pandas module to write the output to csv file
 import pandas as pd
 import re
+# struct module to read the binary records of legacy .doc and .xls files
+import struct
+# argparse module to read the command line options
+import argparse
+# array, csv, heapq, sys and tempfile modules for the bounded-memory result store
+import array
+import csv
+import heapq
+import sys
+import tempfile
+# multiprocessing, itertools and signal modules to run the extraction on several cores
+import multiprocessing
+import multiprocessing.connection
+import itertools
+import signal
+# ctypes, select and time modules for the inotify based watch mode
+import ctypes
+import ctypes.util
+import select
+import time
+# zipfile, io and html modules to read the documents inside zip archives without unzipping them to disk
+import zipfile
+import io
+import html
+# mmap and resource modules to read big pdf files with a small memory footprint
+import mmap
+import resource
+# urllib.parse and functools modules to normalize the urls into a canonical form
+import urllib.parse
+import functools
+# email module to read .eml files
+import email
+# socketserver, threading, json and base64 modules for the extraction service
+import socketserver
+import threading
+import json
+import base64
 
 #--------------------------------------------------
 
@@ -19,14 +56,47 @@ all_urls = []
 # failed files list
 failed = []
 
+# limits for reading zip archives: how deep nested archives are opened, the biggest
+# member we read into memory, and the biggest compression ratio (against zip bombs)
+zipLimits = {
+    "depth": 3,
+    "size": 512 * 1024 * 1024,
+    "ratio": 100,
+}
+
+# pdf files with more pages than this are split into page-range tasks when running with --jobs
+PDF_PAGES_PER_TASK = 250
+
+# seconds a task can run on a worker before the worker is killed and the file is counted as failed
+TASK_TIMEOUT = 600
+
+# with --pdf-memory the peak memory used for every pdf file is printed
+pdfOptions = {
+    "reportMemory": False,
+}
+
+# with --has-links every file is only read until this many urls are found (None = read everything)
+triage = {
+    "limit": None,
+}
+
 #--------------------------------------------------
 
 # extracts urls from text
-def genURLS(text):
+# with a limit, it stops searching after that many urls
+def genURLS(text, limit=None):
     urls = []
     text = text.replace("\\n", " ")
 
     link_regex = r"(?i)\b((?:https?://|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:'\".,<>?«»“”‘’]))"
+
+    if limit is not None:
+        for link in re.finditer(link_regex, text):
+            if len(urls) >= limit:
+                break
+            urls.append(link.group(1))
+        return urls
+
     links = re.findall(link_regex, text)
 
     for link in links:
@@ -34,163 +104,1852 @@ def genURLS(text):
 
     return urls
 
+# a function to get how many more urls we need from a file with --has-links (None = no limit)
+def urlsLeft(urls):
+    if triage["limit"] is None:
+        return None
+    return max(triage["limit"] - len(urls), 0)
+
+#--------------------------------------------------
+"""
+The same link is written in many ways (www.x.com/a, HTTP://X.com/a/, https://x.com/a?utm_source=...),
+so every url also gets a canonical form: scheme and host lowercased, the host IDNA encoded, default
+ports and trailing slashes removed, tracking parameters stripped and punctuation at the end trimmed.
+Urls without a scheme get http://. The canonical url is added as a fifth column and used by --dedup.
+"""
+
+# query parameters that only track where a click came from
+TRACKING_PARAMETERS = re.compile(r"^(utm_[a-z_]+|fbclid|gclid|dclid|gbraid|wbraid|msclkid|yclid|mc_cid|mc_eid|igshid|_ga|_hsenc|_hsmi)$", re.IGNORECASE)
+# ports that are the same as not giving one
+DEFAULT_PORTS = {"http": 80, "https": 443, "ftp": 21}
+# punctuation that ends the sentence rather than the link
+TRAILING_PUNCTUATION = ".,;:!?'\"”’»"
+
+# a function to get the canonical form of one url
+# documents repeat the same urls a lot, so the results are cached
+@functools.lru_cache(maxsize=65536)
+def canonicalURL(url):
+    url = url.rstrip(TRAILING_PUNCTUATION)
+    # a closing bracket is only part of the link if it has an opening one
+    while url.endswith(")") and url.count("(") < url.count(")"):
+        url = url[:-1].rstrip(TRAILING_PUNCTUATION)
+
+    if "://" not in url:
+        url = "http://" + url
+
+    try:
+        parts = urllib.parse.urlsplit(url)
+        port = parts.port
+    except ValueError:
+        # not something we can take apart (bad port, broken ipv6 host), keep it as it is
+        return url
+
+    scheme = parts.scheme.lower()
+    # hostname is already lowercased
+    host = parts.hostname or ""
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    if ":" in host:
+        host = "[" + host + "]"
+
+    netloc = host
+    if parts.username is not None:
+        userInfo = parts.netloc.rpartition("@")[0]
+        netloc = userInfo + "@" + netloc
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc += ":" + str(port)
+
+    path = parts.path.rstrip("/") or "/"
+
+    query = "&".join(parameter for parameter in parts.query.split("&")
+                     if parameter and not TRACKING_PARAMETERS.match(parameter.split("=", 1)[0]))
+
+    return urllib.parse.urlunsplit((scheme, netloc, path, query, parts.fragment))
+
+# a function to add the canonical url to a batch of [url, filename, file type, location] rows
+# every different url in the batch is only normalized once, the rows themselves are not changed
+def canonicalURLs(urls):
+    canonical = {url: canonicalURL(url) for url in set(row[0] for row in urls)}
+    return [row + [canonical[row[0]]] for row in urls]
+
 #--------------------------------------------------
 
 # a function to append links from different files to the all_urls list
+# the rows get their canonical url here, so it is done once per file for every mode
 def appendURL(urls):
-    for url in urls:
+    for url in canonicalURLs(urls):
         all_urls.append(url)
     
 #--------------------------------------------------
 
+# a compact store for the [url, filename, file type, location, canonical url] rows, used instead of the all_urls list
+# when the output has to be sorted or deduplicated.
+# file names and file types are stored once and referenced by an integer id, and once the
+# rows held in memory go over the memory budget they are sorted and spilled to a temporary
+# file (a "run"). reading the store back merges all the runs, so memory stays bounded.
+class URLStore:
+
+    # maximum number of runs merged at once, more than this and the runs are merged into one first
+    MAX_RUNS = 64
+
+    def __init__(self, memoryBudget=256 * 1024 * 1024, dedup=False, tempDir=None):
+        self.memoryBudget = memoryBudget
+        self.dedup = dedup
+        self.tempDir = tempDir
+
+        # interned file names and file types: id -> string and string -> id
+        self.values = []
+        self.valueIds = {}
+
+        # the rows that are still in memory, one entry per row in each
+        self.urls = []
+        self.fileIds = array.array('I')
+        self.typeIds = array.array('I')
+        self.locations = []
+        self.canonicals = []
+        self.memoryUsed = 0
+
+        # the sorted runs spilled to disk
+        self.runs = []
+        self.count = 0
+
+    # a function to get the id of a file name or file type, adding it if it's new
+    def intern(self, value):
+        valueId = self.valueIds.get(value)
+        if valueId is None:
+            valueId = len(self.values)
+            self.values.append(value)
+            self.valueIds[value] = valueId
+        return valueId
+
+    # a function to add one [url, filename, file type, location, canonical url] row, same as list.append
+    # the location (page number, cell) is kept as a string, empty if there is none
+    def append(self, row):
+        url, filename, fileType, location, canonical = row
+        location = "" if location is None else str(location)
+        # most urls are already canonical, then the same string is kept only once
+        if canonical == url:
+            canonical = url
+        self.urls.append(url)
+        self.fileIds.append(self.intern(filename))
+        self.typeIds.append(self.intern(fileType))
+        self.locations.append(location)
+        self.canonicals.append(canonical)
+        self.count += 1
+
+        # the url, location and canonical url strings plus the three list slots and the two array items
+        self.memoryUsed += sys.getsizeof(url) + sys.getsizeof(location) + 32
+        if canonical is not url:
+            self.memoryUsed += sys.getsizeof(canonical)
+        if self.memoryUsed >= self.memoryBudget:
+            self.spill()
+
+    def __len__(self):
+        return self.count
+
+    # the sort key of a row (url, file id, type id, location, canonical url):
+    # canonical url, then file name, then file type, then location, then the url as it was written
+    def key(self, row):
+        return (row[4], self.values[row[1]], self.values[row[2]], row[3], row[0])
+
+    # the rows that --dedup treats as the same: same canonical url in the same place of the same file
+    def dedupKey(self, row):
+        return (row[4], row[1], row[2], row[3])
+
+    # a function to get the rows in memory as (url, file id, type id, location, canonical url)
+    def memoryRows(self):
+        return zip(self.urls, self.fileIds, self.typeIds, self.locations, self.canonicals)
+
+    # a function to write rows to a new run file
+    def writeRun(self, rows):
+        run = tempfile.TemporaryFile(mode="w+", encoding="utf-8", dir=self.tempDir)
+        # urls never contain whitespace, so tab separated lines are safe
+        for url, fileId, typeId, location, canonical in self.dropDuplicates(rows):
+            run.write("%s\t%d\t%d\t%s\t%s\n" % (url, fileId, typeId, location, canonical))
+        return run
+
+    # a function to write the rows in memory to a new sorted run on disk
+    def spill(self):
+        if not self.urls:
+            return
+
+        self.runs.append(self.writeRun(sorted(self.memoryRows(), key=self.key)))
+
+        self.urls = []
+        self.fileIds = array.array('I')
+        self.typeIds = array.array('I')
+        self.locations = []
+        self.canonicals = []
+        self.memoryUsed = 0
+
+        # too many open runs, merge them into one
+        if len(self.runs) > self.MAX_RUNS:
+            merged = self.writeRun(self.mergeRuns())
+            for run in self.runs:
+                run.close()
+            self.runs = [merged]
+
+    # a function to read one run back as (url, file id, type id, location, canonical url) rows
+    def readRun(self, run):
+        run.seek(0)
+        for line in run:
+            url, fileId, typeId, location, canonical = line.rstrip("\n").split("\t")
+            yield url, int(fileId), int(typeId), location, canonical
+
+    # a function to merge all the spilled runs in sorted order
+    def mergeRuns(self):
+        return heapq.merge(*[self.readRun(run) for run in self.runs], key=self.key)
+
+    # a function to skip rows that are the same as the row before (only when dedup is enabled)
+    def dropDuplicates(self, rows):
+        previous = None
+        for row in rows:
+            if self.dedup:
+                key = self.dedupKey(row)
+                if key == previous:
+                    continue
+                previous = key
+            yield row
+
+    # iterating over the store gives the sorted [url, filename, file type, location, canonical url] rows
+    def __iter__(self):
+        inMemory = sorted(self.memoryRows(), key=self.key)
+        rows = heapq.merge(inMemory, *[self.readRun(run) for run in self.runs], key=self.key)
+        for url, fileId, typeId, location, canonical in self.dropDuplicates(rows):
+            yield [url, self.values[fileId], self.values[typeId], location, canonical]
+
+    # a function to remove the temporary files of the runs
+    def close(self):
+        for run in self.runs:
+            run.close()
+        self.runs = []
+
+#--------------------------------------------------
+
+"""
+Big scanned pdf files used to push the memory into the gigabytes: the file was read through a normal
+file object and PyPDF2 keeps every object it resolves in its cache. Now the file is memory-mapped (the
+operating system only loads the parts PyPDF2 actually reads), and the objects resolved for a page
+(mostly its content streams) are dropped from the cache once the page is done. Only the xref and the
+page tree stay resolved.
+"""
+
+# a function to open a pdf file memory-mapped, the mapping stays valid after the file is closed
+def openPDF(filename):
+    with open(filename, 'rb') as pdfFile:
+        return mmap.mmap(pdfFile.fileno(), 0, access=mmap.ACCESS_READ)
+
+# a function to reset the peak memory of the process (linux only, ignored elsewhere)
+def resetPeakMemory():
+    try:
+        with open("/proc/self/clear_refs", "w") as clearRefs:
+            clearRefs.write("5")
+    except OSError:
+        pass
+
+# a function to get the peak memory of the process in megabytes since the last reset
+def peakMemory():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # without /proc we only have the peak since the process started
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
 # a function to extract urls from PDF files
-def urlPDF(filename):
+# firstPage and lastPage (0 based, lastPage not included) let a worker handle only a range of the pages
+# fileObj is used instead of opening the file when the pdf comes from inside an archive
+def urlPDF(filename, firstPage=0, lastPage=None, fileObj=None):
     # list to store all the urls in the file
     urls = []
 
-    # creating a pdf file object
-    pdfFileObj = open(filename, 'rb')
+    if pdfOptions["reportMemory"]:
+        resetPeakMemory()
+
+    # creating a pdf file object, memory-mapped when it's a file on disk
+    pdfFileObj = fileObj or openPDF(filename)
     # creating a pdf reader object
     pdfReader = PyPDF2.PdfFileReader(pdfFileObj)
 
-    # for loop to iterate over all the pages
-    for i in range(pdfReader.numPages):
+    if lastPage is None or lastPage > pdfReader.numPages:
+        lastPage = pdfReader.numPages
+
+    # the objects resolved so far (the xref and the page tree) are kept, everything a page adds is dropped after it
+    resolvedObjects = getattr(pdfReader, "resolvedObjects", {})
+    keepObjects = set(resolvedObjects)
+
+    # for loop to iterate over all the pages in the range
+    for i in range(firstPage, lastPage):
+        # with --has-links we stop reading pages once we have enough urls
+        if urlsLeft(urls) == 0:
+            break
         # creating a page object
         pageObj = pdfReader.getPage(i)
         # extracting all the urls from this page
-        for url in genURLS(pageObj.extractText()):
-            # appending the url, filename and the file type
-            urls.append([url, filename, "PDF File"])
+        for url in genURLS(pageObj.extractText(), urlsLeft(urls)):
+            # appending the url, filename, the file type and the page number
+            urls.append([url, filename, "PDF File", i + 1])
+
+        # releasing the objects of this page
+        for key in [key for key in resolvedObjects if key not in keepObjects]:
+            del resolvedObjects[key]
     
     # closing the pdf file object
     pdfFileObj.close()
+
+    if pdfOptions["reportMemory"]:
+        print("%s (pages %d-%d): peak memory %.1f MB" % (filename, firstPage + 1, lastPage, peakMemory()), file=sys.stderr)
+
     # returning the list of links extracted from the file
     return urls
 
 #--------------------------------------------------
 
+# a function to read the text of a .docx file object, textract can only read files on disk
+def readDOCXText(fileObj):
+    with zipfile.ZipFile(fileObj) as docx:
+        documentXML = docx.read("word/document.xml").decode("utf-8", "ignore")
+    # paragraph ends become new lines, then the tags are removed
+    documentXML = re.sub(r"</w:p>", "\n", documentXML)
+    return html.unescape(re.sub(r"<[^>]+>", "", documentXML))
+
 # a function to extract links from a word document
-def urlDOC(filename):
+# fileObj is used instead of the file name when the document comes from inside an archive
+def urlDOC(filename, fileObj=None):
     # list to store all the urls in the file
     urls = []
 
-    # using the textract module, we extract the text of the word document as a whole
-    text = textract.process(filename)
+    if fileObj is not None:
+        text = readDOCXText(fileObj)
+    # textract picks its parser from the extension, so .docm and misnamed documents are read by us
+    elif not filename.lower().endswith(".docx"):
+        text = readDOCXText(filename)
+    else:
+        # using the textract module, we extract the text of the word document as a whole
+        text = textract.process(filename)
 
     # extracting all the links from the whole document
-    for url in genURLS(str(text)):
-        # appending the url, filename and the file type
-        urls.append([url, filename, "Word File"])
+    for url in genURLS(str(text), urlsLeft(urls)):
+        # appending the url, filename and the file type (no location inside the file)
+        urls.append([url, filename, "Word File", None])
 
     # returning the list of links extracted from the file
     return urls
 
 #--------------------------------------------------
 
-def urlXLS(filename):
+"""
+Spreadsheets can have millions of cells and almost none of them hold a link, so instead of
+running the url regex on every cell we collect the text cells of a sheet into column arrays
+(value, row, column) and match them in batches: a vectorized pandas prefilter drops every
+cell that can't contain a link, and the url regex only runs on the cells that are left.
+"""
+
+# number of cells matched in one batch
+XLS_BATCH_SIZE = 65536
+# smaller batches with --has-links, so we stop reading soon after the first link
+XLS_TRIAGE_BATCH_SIZE = 1024
+
+# a function to get the name of a cell from its row and column (1 based), e.g. (7, 2) -> B7
+def cellName(row, column):
+    letters = ""
+    while column > 0:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters + str(row)
+
+# a function to extract the urls from a batch of excel cells
+# values are the cell strings, rows and columns are their positions
+# with a limit, it stops after that many urls
+def batchCellURLs(values, rows, columns, filename, limit=None):
+    # list to store all the urls in the batch
+    urls = []
+    if not values:
+        return urls
+
+    # every link genURLS can find has "://" in it, or a dot together with "www" or a slash
+    cells = pd.Series(values, dtype=object)
+    candidates = cells.str.contains("://", regex=False) | (
+        cells.str.contains(".", regex=False)
+        & (cells.str.contains("/", regex=False) | cells.str.contains("www", case=False, regex=False))
+    )
+
+    # running the url regex only on the cells that passed the prefilter
+    for index in candidates.to_numpy().nonzero()[0]:
+        if limit is not None and len(urls) >= limit:
+            break
+        for url in genURLS(values[index], None if limit is None else limit - len(urls)):
+            # appending the url, filename, the file type and the cell
+            urls.append([url, filename, "Excel File", cellName(rows[index], columns[index])])
+
+    return urls
+
+#--------------------------------------------------
+
+def urlXLS(filename, fileObj=None):
     # list to store all the urls in the file
     urls = []
 
-    # using openpyxl, we load the excel file
-    wb = openpyxl.load_workbook(filename)
+    # openpyxl checks the extension of a file name, so a misnamed workbook is opened as a file object
+    if fileObj is None and not filename.lower().endswith((".xlsx", ".xlsm")):
+        with open(filename, 'rb') as workbookFile:
+            return urlXLS(filename, workbookFile)
+
+    # using openpyxl, we load the excel file (or the file object when it comes from inside an archive)
+    # read only mode streams the rows instead of building an object for every cell
+    wb = openpyxl.load_workbook(fileObj or filename, read_only=True)
     # and then we open the active sheet (first sheet) in the file
     sheet = wb.active
 
-    # nested loops to iterate over all the cells that are active
-    # i iterates over all the active rows
-    for i in range(sheet.max_row):
-        # j iterates over all the active columns
-        for j in range(sheet.max_column):
-            # extracting url from every cell [for example: cell(1, 1) is the first cell]
-            for url in genURLS(str(sheet.cell(i+1, j+1).value)):
-                # appending the url, filename and the file type
-                urls.append([url, filename, "Excel File"])
-
-     # returning the list of links extracted from the file
+    batchSize = XLS_BATCH_SIZE if triage["limit"] is None else XLS_TRIAGE_BATCH_SIZE
+
+    # collecting the text cells into column arrays, only text cells can hold a link
+    values = []
+    rows = array.array('I')
+    columns = array.array('I')
+    for i, row in enumerate(sheet.iter_rows(values_only=True)):
+        for j, value in enumerate(row):
+            if isinstance(value, str):
+                values.append(value)
+                rows.append(i + 1)
+                columns.append(j + 1)
+
+        # matching a full batch of cells
+        if len(values) >= batchSize:
+            urls.extend(batchCellURLs(values, rows, columns, filename, urlsLeft(urls)))
+            values, rows, columns = [], array.array('I'), array.array('I')
+            # with --has-links we stop reading rows once we have enough urls
+            if urlsLeft(urls) == 0:
+                break
+
+    # extracting the urls from the last batch of cells
+    urls.extend(batchCellURLs(values, rows, columns, filename, urlsLeft(urls)))
+    wb.close()
+
+    # returning the list of links extracted from the file
+    return urls
+
+#--------------------------------------------------
+"""
+Legacy .doc and .xls files are OLE2 compound files (a small FAT file system inside one file).
+Instead of spawning antiword through textract for every .doc, and instead of handing .xls to
+openpyxl (which only reads .xlsx and fails on every old binary workbook), we read the
+compound file ourselves and pull the streams we need.
+"""
+
+# the signature at the start of every OLE2 compound file
+OLE_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+# special sector numbers used in the FAT
+OLE_END_OF_CHAIN = 0xFFFFFFFE
+OLE_FREE_SECTOR = 0xFFFFFFFF
+
+# a function to read all the streams of an OLE2 compound file into a dictionary {name: bytes}
+# the file can be a file name or a file object
+# with namesOnly, only the directory is read and the stream names are returned as a set
+def readOLEStreams(filename, namesOnly=False):
+    # reading the whole file, legacy office files are small enough for this
+    if hasattr(filename, "read"):
+        data = filename.read()
+    else:
+        with open(filename, 'rb') as oleFile:
+            data = oleFile.read()
+
+    if data[:8] != OLE_SIGNATURE:
+        raise ValueError("not an OLE2 compound file")
+
+    # reading the header fields we need
+    sectorSize = 1 << struct.unpack_from("<H", data, 0x1E)[0]
+    miniSectorSize = 1 << struct.unpack_from("<H", data, 0x20)[0]
+    firstDirSector = struct.unpack_from("<I", data, 0x30)[0]
+    miniStreamCutoff = struct.unpack_from("<I", data, 0x38)[0]
+    firstMiniFATSector = struct.unpack_from("<I", data, 0x3C)[0]
+    firstDIFATSector, numDIFATSectors = struct.unpack_from("<II", data, 0x44)
+
+    # a function to get the bytes of one sector (sector 0 starts right after the header)
+    def sector(number):
+        start = (number + 1) * sectorSize
+        return data[start:start + sectorSize]
+
+    # a function to follow a chain of sectors in a FAT, guarding against loops in broken files
+    def chain(fat, start):
+        sectors = []
+        seen = set()
+        while start < len(fat) and start not in seen and start != OLE_END_OF_CHAIN:
+            seen.add(start)
+            sectors.append(start)
+            start = fat[start]
+        return sectors
+
+    # the first 109 FAT sector numbers are in the header, the rest are in the DIFAT sectors
+    fatSectors = list(struct.unpack_from("<109I", data, 0x4C))
+    difatSector = firstDIFATSector
+    for i in range(numDIFATSectors):
+        if difatSector in (OLE_END_OF_CHAIN, OLE_FREE_SECTOR):
+            break
+        entries = struct.unpack("<%dI" % (sectorSize // 4), sector(difatSector))
+        # the last entry of a DIFAT sector points to the next DIFAT sector
+        fatSectors.extend(entries[:-1])
+        difatSector = entries[-1]
+
+    # building the FAT (sector -> next sector)
+    fat = []
+    for fatSector in fatSectors:
+        if fatSector == OLE_FREE_SECTOR:
+            continue
+        fat.extend(struct.unpack("<%dI" % (sectorSize // 4), sector(fatSector)))
+
+    # a function to read a stream that lives in normal sectors
+    def readStream(start, size):
+        stream = b"".join(sector(number) for number in chain(fat, start))
+        return stream[:size]
+
+    # reading the directory, each entry is 128 bytes
+    directory = readStream(firstDirSector, len(data))
+    entries = []
+    for offset in range(0, len(directory) - 127, 128):
+        nameLength = struct.unpack_from("<H", directory, offset + 0x40)[0]
+        entryType = directory[offset + 0x42]
+        start, size = struct.unpack_from("<II", directory, offset + 0x74)
+        name = directory[offset:offset + max(nameLength - 2, 0)].decode("utf-16-le", "ignore")
+        entries.append((name, entryType, start, size))
+
+    if namesOnly:
+        return {name for name, entryType, start, size in entries[1:] if entryType == 2}
+    if not entries:
+        return {}
+
+    # the root entry (always the first one) holds the mini stream that small streams live in
+    rootName, rootType, rootStart, rootSize = entries[0]
+    miniStream = readStream(rootStart, rootSize)
+    miniFAT = []
+    if firstMiniFATSector != OLE_END_OF_CHAIN:
+        miniFATData = readStream(firstMiniFATSector, len(data))
+        miniFAT = list(struct.unpack("<%dI" % (len(miniFATData) // 4), miniFATData))
+
+    # reading every stream entry (type 2) into the dictionary
+    streams = {}
+    for name, entryType, start, size in entries[1:]:
+        if entryType != 2:
+            continue
+        if size < miniStreamCutoff:
+            stream = b"".join(miniStream[number * miniSectorSize:(number + 1) * miniSectorSize] for number in chain(miniFAT, start))
+            streams[name] = stream[:size]
+        else:
+            streams[name] = readStream(start, size)
+
+    return streams
+
+#--------------------------------------------------
+
+# a function to read the text of a legacy (Word 97-2003) .doc file without any external tool
+def readDOCText(filename):
+    streams = readOLEStreams(filename)
+    wordDocument = streams["WordDocument"]
+
+    # the File Information Block (FIB) at the start of the WordDocument stream tells us
+    # which table stream to use (bit 9 of the flags) and where the piece table (Clx) is
+    flags = struct.unpack_from("<H", wordDocument, 0x0A)[0]
+    tableName = "1Table" if flags & 0x0200 else "0Table"
+    fcClx, lcbClx = struct.unpack_from("<II", wordDocument, 0x1A2)
+    table = streams.get(tableName, b"")
+    clx = table[fcClx:fcClx + lcbClx]
+
+    # skipping the formatting (Prc) entries at the start of the Clx until we find the piece table (Pcdt)
+    position = 0
+    while position < len(clx) and clx[position] == 0x01:
+        position += 3 + struct.unpack_from("<h", clx, position + 1)[0]
+
+    # if there is no piece table, we fall back to decoding the raw stream so that links are still found
+    if position >= len(clx) or clx[position] != 0x02:
+        return wordDocument.decode("utf-16-le", "ignore") + " " + wordDocument.decode("cp1252", "ignore")
+
+    # the piece table is (n + 1) character positions followed by n 8 byte piece descriptors
+    pieceTableLength = struct.unpack_from("<I", clx, position + 1)[0]
+    pieceTable = clx[position + 5:position + 5 + pieceTableLength]
+    pieces = (pieceTableLength - 4) // 12
+    positions = struct.unpack_from("<%dI" % (pieces + 1), pieceTable, 0)
+
+    text = []
+    for i in range(pieces):
+        length = positions[i + 1] - positions[i]
+        fc = struct.unpack_from("<I", pieceTable, (pieces + 1) * 4 + i * 8 + 2)[0]
+        # bit 30 of fc means the piece is stored as 8 bit (cp1252) text at fc / 2
+        if fc & 0x40000000:
+            start = (fc & 0x3FFFFFFF) // 2
+            text.append(wordDocument[start:start + length].decode("cp1252", "ignore"))
+        else:
+            text.append(wordDocument[fc:fc + 2 * length].decode("utf-16-le", "ignore"))
+
+    # Word uses \r for paragraph ends and a few control characters for fields and cells
+    return re.sub(r"[\r\x07\x0b\x0c\x13\x14\x15]", " ", "".join(text))
+
+#--------------------------------------------------
+
+# BIFF8 record types we need from the Workbook stream
+XLS_BOF = 0x0809
+XLS_EOF = 0x000A
+XLS_BOUNDSHEET = 0x0085
+XLS_WINDOW1 = 0x003D
+XLS_SST = 0x00FC
+XLS_CONTINUE = 0x003C
+XLS_LABELSST = 0x00FD
+XLS_LABEL = 0x0204
+XLS_RSTRING = 0x00D6
+XLS_STRING = 0x0207
+XLS_FORMULA = 0x0006
+
+# a function to split the Workbook stream into a list of (record type, record data)
+# CONTINUE records are kept in the list so that the SST reader can see the boundaries
+def readXLSRecords(workbook):
+    records = []
+    position = 0
+    while position + 4 <= len(workbook):
+        recordType, length = struct.unpack_from("<HH", workbook, position)
+        records.append((recordType, position, workbook[position + 4:position + 4 + length]))
+        position += 4 + length
+    return records
+
+# a function to read one BIFF8 unicode string from a list of record pieces (SST + CONTINUEs)
+# returns the string and the new (piece, offset) position
+def readXLSString(pieces, piece, offset, lengthSize=2):
+    data = pieces[piece]
+    if offset >= len(data):
+        piece, offset = piece + 1, 0
+        data = pieces[piece]
+
+    length = struct.unpack_from("<H" if lengthSize == 2 else "<B", data, offset)[0]
+    offset += lengthSize
+    options = data[offset]
+    offset += 1
+    richRuns = 0
+    extLength = 0
+    if options & 0x08:
+        richRuns = struct.unpack_from("<H", data, offset)[0]
+        offset += 2
+    if options & 0x04:
+        extLength = struct.unpack_from("<I", data, offset)[0]
+        offset += 4
+
+    # the characters can be split over CONTINUE records, and each continuation
+    # starts with a new flag byte saying if the rest is 8 bit or 16 bit
+    chars = []
+    remaining = length
+    wide = options & 0x01
+    while True:
+        charSize = 2 if wide else 1
+        available = (len(data) - offset) // charSize
+        count = min(remaining, available)
+        chunk = data[offset:offset + count * charSize]
+        chars.append(chunk.decode("utf-16-le" if wide else "latin-1", "ignore"))
+        offset += count * charSize
+        remaining -= count
+        if remaining <= 0 or piece + 1 >= len(pieces):
+            break
+        piece, offset = piece + 1, 0
+        data = pieces[piece]
+        wide = data[offset] & 0x01
+        offset += 1
+
+    # skipping the formatting runs and the extended data, which may also spill over
+    skip = richRuns * 4 + extLength
+    while skip > 0:
+        available = len(data) - offset
+        if skip <= available:
+            offset += skip
+            break
+        skip -= available
+        if piece + 1 >= len(pieces):
+            break
+        piece, offset = piece + 1, 0
+        data = pieces[piece]
+
+    return "".join(chars), piece, offset
+
+# a function to read the string cells in the active sheet of a legacy .xls file
+# yields (string, row, column), row and column are 1 based like in openpyxl
+def readXLSCells(filename):
+    streams = readOLEStreams(filename)
+    workbook = streams.get("Workbook", streams.get("Book"))
+    if workbook is None:
+        raise ValueError("no Workbook stream in the file")
+
+    records = readXLSRecords(workbook)
+
+    # reading the workbook globals: the sheets, the active sheet and the shared strings table
+    sheetOffsets = []
+    activeSheet = 0
+    sharedStrings = []
+    for index, (recordType, position, data) in enumerate(records):
+        if recordType == XLS_BOUNDSHEET:
+            # keeping the sheet type too, only worksheets (type 0) have cells we can read
+            sheetOffsets.append((struct.unpack_from("<I", data, 0)[0], data[5]))
+        elif recordType == XLS_WINDOW1:
+            activeSheet = struct.unpack_from("<H", data, 10)[0]
+        elif recordType == XLS_SST:
+            pieces = [data]
+            for nextType, nextPosition, nextData in records[index + 1:]:
+                if nextType != XLS_CONTINUE:
+                    break
+                pieces.append(nextData)
+            uniqueCount = struct.unpack_from("<I", data, 4)[0]
+            piece, offset = 0, 8
+            for i in range(uniqueCount):
+                if piece >= len(pieces) or (piece == len(pieces) - 1 and offset >= len(pieces[piece])):
+                    break
+                string, piece, offset = readXLSString(pieces, piece, offset)
+                sharedStrings.append(string)
+        elif recordType == XLS_EOF:
+            break
+
+    # falling back to the first worksheet if the active sheet is a chart or macro sheet
+    worksheets = [offset for offset, sheetType in sheetOffsets if sheetType == 0]
+    if not worksheets:
+        return
+    if activeSheet < len(sheetOffsets) and sheetOffsets[activeSheet][1] == 0:
+        sheetOffset = sheetOffsets[activeSheet][0]
+    else:
+        sheetOffset = worksheets[0]
+
+    # reading the string cells of the active sheet substream
+    # every cell record starts with the row and the column (0 based)
+    started = False
+    formulaCell = (0, 0)
+    for recordType, position, data in records:
+        if not started:
+            started = position == sheetOffset
+            continue
+        if recordType == XLS_EOF:
+            break
+        if recordType == XLS_LABELSST:
+            row, column = struct.unpack_from("<HH", data, 0)
+            index = struct.unpack_from("<I", data, 6)[0]
+            if index < len(sharedStrings):
+                yield sharedStrings[index], row + 1, column + 1
+        elif recordType in (XLS_LABEL, XLS_RSTRING):
+            row, column = struct.unpack_from("<HH", data, 0)
+            yield readXLSString([data], 0, 6)[0], row + 1, column + 1
+        elif recordType == XLS_FORMULA:
+            formulaCell = struct.unpack_from("<HH", data, 0)
+        elif recordType == XLS_STRING:
+            # the cached string result of the formula just before it
+            yield readXLSString([data], 0, 0)[0], formulaCell[0] + 1, formulaCell[1] + 1
+
+#--------------------------------------------------
+
+# a function to extract links from a legacy (Word 97-2003) word document
+def urlLegacyDOC(filename, fileObj=None):
+    # list to store all the urls in the file
+    urls = []
+
+    # reading the text straight from the compound file, no antiword process needed
+    for url in genURLS(readDOCText(fileObj or filename), urlsLeft(urls)):
+        # appending the url, filename and the file type (no location inside the file)
+        urls.append([url, filename, "Word File", None])
+
+    # returning the list of links extracted from the file
+    return urls
+
+#--------------------------------------------------
+
+# a function to extract links from a legacy (Excel 97-2003) workbook
+def urlLegacyXLS(filename, fileObj=None):
+    # list to store all the urls in the file
+    urls = []
+
+    batchSize = XLS_BATCH_SIZE if triage["limit"] is None else XLS_TRIAGE_BATCH_SIZE
+
+    # collecting the string cells of the active sheet into column arrays
+    values = []
+    rows = array.array('I')
+    columns = array.array('I')
+    for value, row, column in readXLSCells(fileObj or filename):
+        values.append(value)
+        rows.append(row)
+        columns.append(column)
+        if len(values) >= batchSize:
+            urls.extend(batchCellURLs(values, rows, columns, filename, urlsLeft(urls)))
+            values, rows, columns = [], array.array('I'), array.array('I')
+            # with --has-links we stop reading cells once we have enough urls
+            if urlsLeft(urls) == 0:
+                break
+
+    # extracting the urls from the last batch of cells
+    urls.extend(batchCellURLs(values, rows, columns, filename, urlsLeft(urls)))
+
+    # returning the list of links extracted from the file
     return urls
 
 #--------------------------------------------------
 
+# archive members are decompressed this many bytes at a time, so the zip bomb limits are checked while reading
+ZIP_CHUNK_SIZE = 1024 * 1024
+
+# a function to read one member of a zip archive into memory, checking the zip bomb limits
+def readZipMember(archive, info):
+    if info.file_size > zipLimits["size"]:
+        raise ValueError("archive member is too big: " + info.filename)
+    if info.file_size > 1024 * 1024 and info.file_size > zipLimits["ratio"] * max(info.compress_size, 1):
+        raise ValueError("archive member compression ratio is too high: " + info.filename)
+
+    # the sizes in the archive can lie, so we count the bytes we really decompress and stop as soon as
+    # they go over the size limit or the compression ratio (the compressed bytes read are at most compress_size)
+    ratioLimit = max(1024 * 1024, zipLimits["ratio"] * max(info.compress_size, 1))
+    chunks = []
+    size = 0
+    with archive.open(info) as member:
+        while True:
+            chunk = member.read(ZIP_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > zipLimits["size"]:
+                raise ValueError("archive member is too big: " + info.filename)
+            if size > ratioLimit:
+                raise ValueError("archive member compression ratio is too high: " + info.filename)
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+# a function to extract links from the documents inside a zip archive, without unzipping it to disk
+# the members are reported as archive.zip!/inner/file.docx, and members that can't be
+# read are added to failedMembers instead of failing the whole archive
+def urlZIP(filename, failedMembers, fileObj=None, depth=1):
+    # list to store all the urls in the archive
+    urls = []
+
+    # a nested archive deeper than the limit is reported as failed by the archive it's in
+    if depth > zipLimits["depth"]:
+        raise ValueError("archive is nested too deep: " + filename)
+
+    with zipfile.ZipFile(fileObj or filename) as archive:
+        for info in archive.infolist():
+            memberName = filename + "!/" + info.filename
+            # skipping folders
+            if info.is_dir():
+                continue
+
+            try:
+                # skipping the files we don't read, only the first bytes of a member
+                # with an unknown extension are decompressed to sniff its format
+                if fileExtension(info.filename) not in handlersByExtension and not sniffHandlers(memberHead(archive, info)):
+                    continue
+                memberObj = io.BytesIO(readZipMember(archive, info))
+                urls.extend(fileURLs(memberName, failedMembers, memberObj, depth + 1)[:urlsLeft(urls)])
+            except:
+                failedMembers.append(memberName)
+
+            # with --has-links we stop opening members once we have enough urls
+            if urlsLeft(urls) == 0:
+                break
+
+    # returning the list of links extracted from the archive
+    return urls
+
+# a function to read the first bytes of a zip archive member
+def memberHead(archive, info):
+    with archive.open(info) as member:
+        return member.read(HEAD_SIZE)
+
+#--------------------------------------------------
+
+# a function to extract links from a powerpoint presentation, the location is the slide number
+def urlPPTX(filename, fileObj=None):
+    # list to store all the urls in the file
+    urls = []
+
+    with zipfile.ZipFile(fileObj or filename) as pptx:
+        # the slides are ppt/slides/slide1.xml, slide2.xml, ... sorted by their number
+        slides = []
+        for name in pptx.namelist():
+            match = re.match(r"ppt/slides/slide(\d+)\.xml$", name)
+            if match:
+                slides.append((int(match.group(1)), name))
+        slides.sort()
+
+        for number, name in slides:
+            slideXML = pptx.read(name).decode("utf-8", "ignore")
+            # paragraph ends become new lines, then the tags are removed
+            slideXML = re.sub(r"</a:p>", "\n", slideXML)
+            text = html.unescape(re.sub(r"<[^>]+>", "", slideXML))
+
+            for url in genURLS(text, urlsLeft(urls)):
+                # appending the url, filename, the file type and the slide number
+                urls.append([url, filename, "PowerPoint File", number])
+            # with --has-links we stop reading slides once we have enough urls
+            if urlsLeft(urls) == 0:
+                break
+
+    # returning the list of links extracted from the file
+    return urls
+
+# a function to extract links from a web page, the links in the tags are found the same as in the text
+def urlHTML(filename, fileObj=None):
+    # list to store all the urls in the file
+    urls = []
+
+    if fileObj is not None:
+        data = fileObj.read()
+    else:
+        with open(filename, 'rb') as htmlFile:
+            data = htmlFile.read()
+    text = html.unescape(data.decode("utf-8", "ignore"))
+
+    for url in genURLS(text, urlsLeft(urls)):
+        # appending the url, filename and the file type (no location inside the file)
+        urls.append([url, filename, "Web Page", None])
+
+    # returning the list of links extracted from the file
+    return urls
+
+# a function to extract links from the text and html bodies of an email, attachments are skipped
+def urlEML(filename, fileObj=None):
+    # list to store all the urls in the file
+    urls = []
+
+    if fileObj is not None:
+        message = email.message_from_binary_file(fileObj)
+    else:
+        with open(filename, 'rb') as emailFile:
+            message = email.message_from_binary_file(emailFile)
+
+    for part in message.walk():
+        if part.get_content_maintype() != "text" or part.get_filename():
+            continue
+        # the body is decoded from base64 / quoted-printable, then from its charset
+        payload = part.get_payload(decode=True) or b""
+        try:
+            text = payload.decode(part.get_content_charset() or "utf-8", "ignore")
+        except LookupError:
+            text = payload.decode("utf-8", "ignore")
+        if part.get_content_subtype() == "html":
+            text = html.unescape(text)
+
+        for url in genURLS(text, urlsLeft(urls)):
+            # appending the url, filename and the file type (no location inside the file)
+            urls.append([url, filename, "Email", None])
+
+    # returning the list of links extracted from the file
+    return urls
+
+#--------------------------------------------------
+"""
+The file formats we read are kept in a registry instead of one if/elif chain on the extension.
+A handler is registered with its extensions (lowercase), the magic bytes its files start with,
+and a relative cost per byte that is used to start the expensive files first with --jobs.
+A file is matched by its extension, unless its first bytes belong to another format: then the
+format of the first bytes wins, so a misnamed file still goes to the right parser. Formats that
+share a signature (docx, xlsx, pptx and zip all start with PK) have a detect function that looks
+inside the file, it's only used when the extension doesn't tell us.
+New formats are added with registerHandler, fileURLs doesn't change.
+"""
+
+# number of bytes read from the start of a file to sniff its format
+HEAD_SIZE = 16
+
+# the registered handlers in the order they are tried when sniffing, and the handlers by extension
+handlers = []
+handlersByExtension = {}
+
+# a function to register a file format
+# function is called as function(filename, fileObj), or as function(filename, failedMembers, fileObj, depth)
+# for container formats (archives) whose members are extracted on their own
+def registerHandler(name, function, extensions=(), signatures=(), cost=1.0, detect=None, container=False):
+    handler = {
+        "name": name,
+        "function": function,
+        "extensions": tuple(extensions),
+        "signatures": tuple(signatures),
+        "cost": cost,
+        "detect": detect,
+        "container": container,
+    }
+    handlers.append(handler)
+    for extension in handler["extensions"]:
+        handlersByExtension[extension] = handler
+    return handler
+
+# a function to get the lowercase extension of a file name, without the dot
+def fileExtension(filename):
+    return os.path.splitext(filename)[1][1:].lower()
+
+# a function to read the first bytes of a file name or a file object, the file object is rewound
+# a file that can't be read gives no bytes, the handler will report the error when it opens it
+def readHead(source):
+    if hasattr(source, "read"):
+        head = source.read(HEAD_SIZE)
+        source.seek(0)
+        return head
+    try:
+        with open(source, 'rb') as headFile:
+            return headFile.read(HEAD_SIZE)
+    except OSError:
+        return b""
+
+# a function to get the handlers whose signature the first bytes of a file start with
+def sniffHandlers(head):
+    return [handler for handler in handlers if head.startswith(handler["signatures"])]
+
+# a function to find the handler for a file, source is the file name or a file object with its contents
+# returns None for the files we don't read
+def findHandler(filename, source=None):
+    if source is None:
+        source = filename
+
+    sniffed = sniffHandlers(readHead(source))
+    handler = handlersByExtension.get(fileExtension(filename))
+    # the first bytes don't tell us anything else, or they only fit the format of the extension
+    if handler is not None and (not sniffed or sniffed == [handler]):
+        return handler
+
+    # formats that share a signature (doc/xls, docx/xlsx/pptx/zip) are told apart by what is inside the file,
+    # checking the format of the extension first, then the others
+    if handler in sniffed:
+        sniffed.remove(handler)
+        sniffed.insert(0, handler)
+    for candidate in sniffed:
+        if candidate["detect"] is None:
+            return candidate
+        try:
+            detected = candidate["detect"](source)
+        except Exception:
+            detected = False
+        finally:
+            if hasattr(source, "seek"):
+                source.seek(0)
+        if detected:
+            return candidate
+    # nothing inside the file says what it is, so we go by the extension (None for the files we don't read),
+    # a .jar or .odt file starts like a zip archive but it isn't one of ours
+    return handler
+
+# a function to check if a file on disk is one we read, without opening it when the extension tells us
+def isDocument(filename):
+    return fileExtension(filename) in handlersByExtension or findHandler(filename) is not None
+
+# a function to get the estimated cost of extracting a file: the cost of its format times its size
+def estimatedCost(filename, handler):
+    if handler is None:
+        return 0
+    try:
+        return handler["cost"] * os.path.getsize(filename)
+    except OSError:
+        return 0
+
+# functions to tell apart the formats that share a signature by the names inside the file
+def zipHasMember(memberName):
+    def detect(source):
+        with zipfile.ZipFile(source) as archive:
+            return memberName in archive.namelist()
+    return detect
+
+# members that make a zip file a format of its own (jar/apk, odt/epub, office files) instead of an archive of documents
+ZIP_PACKAGE_MEMBERS = ("META-INF/MANIFEST.MF", "AndroidManifest.xml", "mimetype", "[Content_Types].xml")
+
+def zipIsArchive(source):
+    with zipfile.ZipFile(source) as archive:
+        return not any(memberName in ZIP_PACKAGE_MEMBERS for memberName in archive.namelist())
+
+def oleHasStream(*streamNames):
+    def detect(source):
+        streams = readOLEStreams(source, namesOnly=True)
+        return any(streamName in streams for streamName in streamNames)
+    return detect
+
+ZIP_SIGNATURE = b"PK\x03\x04"
+
+# the formats we read, most specific first (the plain zip archive is the last PK format)
+# costs are per byte, relative to a legacy word document
+registerHandler("pdf", lambda filename, fileObj: urlPDF(filename, fileObj=fileObj),
+                extensions=["pdf"], signatures=[b"%PDF-"], cost=4.0)
+registerHandler("doc", urlLegacyDOC, extensions=["doc", "dot"], signatures=[OLE_SIGNATURE],
+                cost=1.0, detect=oleHasStream("WordDocument"))
+registerHandler("xls", urlLegacyXLS, extensions=["xls", "xlt"], signatures=[OLE_SIGNATURE],
+                cost=1.0, detect=oleHasStream("Workbook", "Book"))
+registerHandler("docx", urlDOC, extensions=["docx", "docm"], signatures=[ZIP_SIGNATURE],
+                cost=2.0, detect=zipHasMember("word/document.xml"))
+registerHandler("xlsx", urlXLS, extensions=["xlsx", "xlsm"], signatures=[ZIP_SIGNATURE],
+                cost=3.0, detect=zipHasMember("xl/workbook.xml"))
+registerHandler("pptx", urlPPTX, extensions=["pptx", "pptm"], signatures=[ZIP_SIGNATURE],
+                cost=1.0, detect=zipHasMember("ppt/presentation.xml"))
+registerHandler("zip", urlZIP, extensions=["zip"], signatures=[ZIP_SIGNATURE],
+                cost=1.0, detect=zipIsArchive, container=True)
+registerHandler("html", urlHTML, extensions=["htm", "html"],
+                signatures=[b"<!DOCTYPE html", b"<!doctype html", b"<html", b"<HTML"], cost=0.5)
+registerHandler("eml", urlEML, extensions=["eml"], cost=0.5)
+
+#--------------------------------------------------
+
+# a function to run the right extraction function for a file and return its urls
+# raises an exception if the file can't be read
+# fileObj, failedMembers and depth are used for the documents inside zip archives
+def fileURLs(file, failedMembers=None, fileObj=None, depth=1):
+    if failedMembers is None:
+        failedMembers = failed
+
+    handler = findHandler(file, fileObj)
+    # not one of the formats we read, no urls
+    if handler is None:
+        return []
+
+    if handler["container"]:
+        return handler["function"](file, failedMembers, fileObj, depth)
+    return handler["function"](file, fileObj)
+
+#--------------------------------------------------
+
 def extractURLs(file):
     try:
-        # defining the extensions that we need
-        listOfExtensions = ["doc", "docx", "xls", "xlsx", "pdf"]
-
-        # saving the file name in a variable
-        filename = file
-        # splitting the file name to get the extension
-        file = file.split(".")
-        # the extension = the last item after the dot (.)
-        extension = file[len(file)-1]
-        
-        # if the extension of the file in the list of the extensions
-        if extension in listOfExtensions:
-            # then we check which extension, if it's doc or docx
-            if extension == "doc" or extension == "docx":
-                # run the function to extract the urls by sending the file name
-                urls = urlDOC(filename)
-                # then append all the urls that are returned to the all_urls list
-                appendURL(urls)
-            # if the extension is pdf then...
-            elif extension == "pdf":
-                # run the function to extract the urls by sending the file name
-                urls = urlPDF(filename)
-                # then append all the urls that are returned to the all_urls list
-                appendURL(urls)
-            # if the extension is an excel file then...
-            elif extension == "xls" or extension == "xlsx":
-                # run the function to extract the urls by sending the file name
-                urls = urlXLS(filename)
-                # then append all the urls that are returned to the all_urls list
-                appendURL(urls)
+        # run the function to extract the urls by sending the file name
+        urls = fileURLs(file)
+        # then append all the urls that are returned to the all_urls list
+        appendURL(urls)
     except:
-        failed.append(filename)
+        failed.append(file)
 
 #--------------------------------------------------
+"""
+With --jobs the files are extracted by a pool of worker processes.
+Every file is one task, except big pdf files which are split into page-range tasks
+so that a single 5,000 page pdf can use all the cores.
+A task is (filename, firstPage, lastPage), the pages are None for a whole file task.
+"""
 
-# getting a list of files in the current directory
-files = os.listdir(os.getcwd())
+# a function to count the pages of a pdf file
+def pdfPageCount(filename):
+    pdfFileObj = openPDF(filename)
+    try:
+        return PyPDF2.PdfFileReader(pdfFileObj).numPages
+    finally:
+        pdfFileObj.close()
+
+# a function to build the list of tasks for the files
+# the most expensive files are started first, so one big file doesn't keep a worker busy after the rest is done
+def extractionTasks(filenames, pagesPerTask=PDF_PAGES_PER_TASK):
+    files = []
+    for filename in filenames:
+        handler = findHandler(filename)
+        files.append((estimatedCost(filename, handler), filename, handler))
+    files.sort(key=lambda file: file[0], reverse=True)
+
+    tasks = []
+    for cost, filename, handler in files:
+        pages = None
+        # pagesPerTask None means pdf files are never split
+        if pagesPerTask and handler is not None and handler["name"] == "pdf":
+            try:
+                pages = pdfPageCount(filename)
+            except:
+                # let the worker fail on it, so it ends up in the failed list
+                pages = None
+
+        if pages and pages > pagesPerTask:
+            for firstPage in range(0, pages, pagesPerTask):
+                tasks.append((filename, firstPage, min(firstPage + pagesPerTask, pages)))
+        else:
+            tasks.append((filename, None, None))
+    return tasks
+
+# a function that runs one task in a worker, returns (filename, urls, failed files)
+# the failed files are [filename] if the file failed, or the archive members that failed
+def runTask(task):
+    filename, firstPage, lastPage = task
+    failedMembers = []
+    try:
+        if firstPage is None:
+            return filename, fileURLs(filename, failedMembers), failedMembers
+        return filename, urlPDF(filename, firstPage, lastPage), failedMembers
+    except:
+        return filename, [], [filename]
 
-# iterating over every file and folder and files in folder
-for file in files:
-    if os.path.isdir(file): 
-        path = os.getcwd() + "/" + file
-        insidefiles = os.listdir(path)
-        for insidefile in insidefiles:
-            extractURLs(path + "/" + insidefile)
+# a function that gives the result of a task whose worker died or timed out, the file failed
+def failedTask(task, error):
+    filename, firstPage, lastPage = task
+    if firstPage is None:
+        print("%s: %s" % (filename, error), file=sys.stderr)
     else:
-        extractURLs(os.getcwd() + "/" + file)
+        print("%s (pages %d-%d): %s" % (filename, firstPage + 1, lastPage, error), file=sys.stderr)
+    return filename, [], [filename]
+
+# a worker process: runs the (function, task) jobs it gets and sends back the results, until it gets None
+def workerLoop(connection):
+    # ctrl+c is for the main process, it stops the workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        job = connection.recv()
+        if job is None:
+            break
+        function, task = job
+        connection.send(function(task))
+    connection.close()
+
+# the pool of worker processes for --jobs, the watch mode and the service
+# multiprocessing.Pool never gives a result for a task whose worker died (a segfault in PyPDF2/zlib,
+# an OOM kill on a huge pdf) and a hung task keeps its worker forever, so one bad file blocks the whole scan.
+# here every worker has its own pipe: a task that runs longer than the timeout (from when its worker got it)
+# has its worker killed, a dead worker is noticed when its pipe closes, and the other tasks keep going.
+# workers are started when they are needed, and the pool can be used by several threads at once (the service)
+class WorkerPool:
+
+    def __init__(self, processes, timeout=TASK_TIMEOUT):
+        self.processes = max(processes, 1)
+        self.timeout = timeout
+        # the idle workers [(process, connection)] and the number of workers, idle or busy
+        self.idle = []
+        self.count = 0
+        self.condition = threading.Condition()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # a function to get an idle worker, or start one if there are less than processes
+    # if every worker is busy it waits for one, or returns None with wait False
+    def takeWorker(self, wait):
+        with self.condition:
+            while True:
+                if self.idle:
+                    return self.idle.pop()
+                if self.count < self.processes:
+                    self.count += 1
+                    # started with the lock held, so no other worker is forked while the child end of the pipe is still open here
+                    parentConnection, childConnection = multiprocessing.Pipe()
+                    process = multiprocessing.Process(target=workerLoop, args=(childConnection,), daemon=True)
+                    process.start()
+                    childConnection.close()
+                    return process, parentConnection
+                if not wait:
+                    return None
+                self.condition.wait()
+
+    # a function to give a worker back to the pool after its task
+    def giveWorker(self, worker):
+        with self.condition:
+            self.idle.append(worker)
+            self.condition.notify()
+
+    # a function to kill a worker that hung or died, a new one is started the next time one is needed
+    def killWorker(self, worker):
+        process, connection = worker
+        process.kill()
+        process.join()
+        connection.close()
+        with self.condition:
+            self.count -= 1
+            self.condition.notify()
+
+    # a function to run function(task) for every task on the workers, yields the results in the order of the tasks
+    # a task whose worker dies or runs longer than the timeout gets failedResult(task, error)
+    def imap(self, function, tasks, failedResult):
+        tasks = iter(tasks)
+        nextTask = next(tasks, self)
+        # the results by task number, until it's their turn
+        results = {}
+        taskCount = 0
+        resultCount = 0
+        # our busy workers: connection -> (process, task number, task, start time)
+        running = {}
+
+        try:
+            while True:
+                # give tasks to free workers, wait for a worker only if none of ours is running
+                while nextTask is not self:
+                    worker = self.takeWorker(not running)
+                    if worker is None:
+                        break
+                    process, connection = worker
+                    connection.send((function, nextTask))
+                    running[connection] = (process, taskCount, nextTask, time.time())
+                    taskCount += 1
+                    nextTask = next(tasks, self)
+
+                if not running:
+                    break
+
+                # wait for a result or until the oldest task times out, and look for free workers now and then if tasks are waiting
+                waitTime = max(0, min(start for _process, _number, _task, start in running.values()) + self.timeout - time.time())
+                if nextTask is not self:
+                    waitTime = min(waitTime, 0.1)
+                for connection in multiprocessing.connection.wait(list(running), waitTime):
+                    process, number, task, start = running.pop(connection)
+                    try:
+                        results[number] = connection.recv()
+                    except (OSError, EOFError):
+                        self.killWorker((process, connection))
+                        results[number] = failedResult(task, "worker died (exit code %s)" % process.exitcode)
+                    else:
+                        self.giveWorker((process, connection))
+
+                now = time.time()
+                for connection, (process, number, task, start) in list(running.items()):
+                    if now - start > self.timeout:
+                        del running[connection]
+                        self.killWorker((process, connection))
+                        results[number] = failedResult(task, "timed out after %gs" % self.timeout)
+
+                while resultCount in results:
+                    yield results.pop(resultCount)
+                    resultCount += 1
+        finally:
+            # stopped before the end (or an error): the tasks still running are not needed any more
+            for connection, (process, number, task, start) in running.items():
+                self.killWorker((process, connection))
+
+    # a function to stop the idle workers, the busy ones are killed by the imap that runs them
+    def close(self):
+        with self.condition:
+            idle, self.idle = self.idle, []
+        for process, connection in idle:
+            try:
+                connection.send(None)
+            except (OSError, EOFError):
+                pass
+            process.join()
+            connection.close()
+            with self.condition:
+                self.count -= 1
+
+# a function to extract the files, on the pool of workers if there is one
+# yields (filename, urls, failed files) for every file, in the order of the files (on a pool, the most expensive file first)
+# the results come back in task order, so the page ranges of a pdf are stitched back in page order
+# a task whose worker died or timed out gets failedResult(task, error)
+def extractFiles(filenames, pool=None, pagesPerTask=PDF_PAGES_PER_TASK, failedResult=failedTask):
+    if pool is None:
+        for filename in filenames:
+            yield runTask((filename, None, None))
+        return
+
+    results = pool.imap(runTask, extractionTasks(filenames, pagesPerTask), failedResult)
+    # the tasks of a file are next to each other, so we group the results by file
+    for filename, fileResults in itertools.groupby(results, key=lambda result: result[0]):
+        fileResults = list(fileResults)
+        # if any page range failed, the file failed, same as when it's extracted in one go
+        if any(filename in failedFiles for _filename, _urls, failedFiles in fileResults):
+            yield filename, [], [filename]
+        else:
+            yield filename, [url for _filename, urls, _failed in fileResults for url in urls], [member for _filename, _urls, failedFiles in fileResults for member in failedFiles]
+
+# a function to run the tasks on a pool of workers and collect the results
+def extractURLsParallel(filenames, jobs, pagesPerTask=PDF_PAGES_PER_TASK, timeout=TASK_TIMEOUT):
+    with WorkerPool(jobs, timeout) as pool:
+        for filename, urls, failedFiles in extractFiles(filenames, pool, pagesPerTask):
+            appendURL(urls)
+            failed.extend(failedFiles)
+
+#--------------------------------------------------
+
+# a function to write the rows of the all_urls store to the output csv one row at a time
+# same layout as the DataFrame output: index column, then the five columns
+def writeURLStore(store, outputFile):
+    with open(outputFile, 'w', newline='', encoding='utf-8') as csvFile:
+        writer = csv.writer(csvFile, lineterminator=os.linesep)
+        writer.writerow(['', 'Full URLs', 'File Name & Directory', 'Extensions', 'Location', 'Canonical URL'])
+        for index, row in enumerate(store):
+            writer.writerow([index] + row)
+
+#--------------------------------------------------
+
+# a function to get the full paths of the files in the current directory and the folders in it
+def listFiles():
+    # getting a list of files in the current directory
+    files = os.listdir(os.getcwd())
+    # list of the full paths of the files to extract
+    filesToExtract = []
+
+    # iterating over every file and folder and files in folder
+    for file in files:
+        if os.path.isdir(file): 
+            path = os.getcwd() + "/" + file
+            insidefiles = os.listdir(path)
+            for insidefile in insidefiles:
+                filesToExtract.append(path + "/" + insidefile)
+        else:
+            filesToExtract.append(os.getcwd() + "/" + file)
+
+    return filesToExtract
+
+#--------------------------------------------------
+
+# a function to make an empty all_urls for the command line options
+def newURLList(args):
+    # sorted or deduplicated output uses the bounded-memory store instead of a list
+    if args.sort or args.dedup:
+        return URLStore(memoryBudget=args.memory_budget * 1024 * 1024, dedup=args.dedup)
+    return []
+
+#--------------------------------------------------
+
+# a function to write all_urls to output.csv and the failed list to failed.csv
+def writeOutput():
+    """
+    At this point we have the list all_urls, which each entry consists of [url, filename, file type, location, canonical url]
+    the location is the page number for pdf files and the cell for excel files
+    """
+
+    failedDF = pd.DataFrame(failed)
+    # create csv file with failed files
+    failedDF.to_csv('failed.csv', index=True)
+
+    # the store is written row by row so it never has to be held in memory as a whole
+    if isinstance(all_urls, URLStore):
+        writeURLStore(all_urls, 'output.csv')
+        all_urls.close()
+        return
+
+    # we separate each entry from the list to five separate lists
+    # links list to store the urls
+    links = []
+    # filenames list to store the file names
+    filenames = []
+    # extensions list to store the extensions
+    extensions = []
+    # locations list to store the page numbers and cells
+    locations = []
+    # canonicals list to store the canonical urls
+    canonicals = []
+
+    # we iterate over every entry
+    for url in all_urls:
+        # and append the data to every list
+        links.append(url[0])
+        filenames.append(url[1])
+        extensions.append(url[2])
+        locations.append(url[3])
+        canonicals.append(url[4])
+
+    # we define a DataFrame to append it to the csv with five columns
+    df = pd.DataFrame({
+        'Full URLs': links,
+        'File Name & Directory': filenames,
+        'Extensions' : extensions,
+        'Location' : locations,
+        'Canonical URL' : canonicals
+    })
+
+    # we append the DataFrame to the csv, with indexing enabled
+    df.to_csv('output.csv', index=True)
 
 #--------------------------------------------------
 """
-At this point we have the list all_urls, which each entry consists of [url, filename, file type]
+Watch mode: after the first scan we keep running and use Linux inotify to see new, changed,
+moved and deleted files in the current directory and the folders in it.
+Events are collected until nothing has happened for --debounce seconds (so a burst of
+uploads is handled as one batch), then the changed files are extracted by the same
+workers and the output files are written again.
 """
 
-# we separate each entry from the list to three separate lists
-# links list to store the urls
-links = []
-# filenames list to store the file names
-filenames = []
-# extensions list to store the extensions
-extensions = []
+# inotify event flags, from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+# the events we watch for in every folder
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# a small wrapper around the inotify system calls
+class Inotify:
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # watch descriptor -> folder
+        self.watches = {}
+
+    # a function to start watching a folder
+    def add(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed for " + directory)
+        self.watches[wd] = directory
+
+    # a function to wait up to timeout seconds (forever if None) for events
+    # returns a list of (path, event flags), empty if nothing happened
+    def read(self, timeout=None):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+
+        data = os.read(self.fd, 64 * 1024)
+        events = []
+        offset = 0
+        # every event is wd, mask, cookie, name length, then the name padded with zeros
+        while offset + 16 <= len(data):
+            wd, mask, cookie, length = struct.unpack_from("iIII", data, offset)
+            name = data[offset + 16:offset + 16 + length].rstrip(b"\0")
+            offset += 16 + length
+
+            if mask & IN_IGNORED:
+                # the folder was deleted or moved away
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            events.append((directory + "/" + os.fsdecode(name), mask))
 
-# we iterate over every entry
-for url in all_urls:
-    # and append the data to every list
-    links.append(url[0])
-    filenames.append(url[1])
-    extensions.append(url[2])
+        return events
 
-# we define a DataFrame to append it to the csv with three columns
-df = pd.DataFrame({
-    'Full URLs': links,
-    'File Name & Directory': filenames,
-    'Extensions' : extensions  
-})
+    def close(self):
+        os.close(self.fd)
+
+#--------------------------------------------------
+
+# a function to turn inotify events into pending changes {path: True to extract, False to remove}
+def addPendingChanges(pending, events, inotify, results):
+    for path, mask in events:
+        if mask & IN_ISDIR:
+            # only the folders directly in the current directory are scanned
+            if os.path.dirname(path) != os.getcwd():
+                continue
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                inotify.add(path)
+                # files could already be in it before the watch started
+                for insidefile in os.listdir(path):
+                    pending[path + "/" + insidefile] = True
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                for filename in results:
+                    if filename.startswith(path + "/"):
+                        pending[filename] = False
+        # a new file shows up as IN_CREATE and then IN_CLOSE_WRITE, we wait for the second one
+        elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+            pending[path] = True
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            pending[path] = False
+
+# a function to apply the pending changes to the results {filename: urls} and failed files {filename: [failed files]}
+def applyPendingChanges(pending, results, failedFiles, pool, pagesPerTask):
+    toExtract = []
+    for filename, changed in pending.items():
+        results.pop(filename, None)
+        failedFiles.pop(filename, None)
+        # only files we can read, the file could also be gone again by now
+        if changed and os.path.isfile(filename) and isDocument(filename):
+            toExtract.append(filename)
+
+    for filename, urls, failedMembers in extractFiles(toExtract, pool, pagesPerTask):
+        results[filename] = urls
+        if failedMembers:
+            failedFiles[filename] = failedMembers
+
+# a function to write the output files from the results of the watch mode
+def writeWatchOutput(args, results, failedFiles):
+    global all_urls
+
+    all_urls = newURLList(args)
+    for urls in results.values():
+        appendURL(urls)
+    failed[:] = [failedFile for failedMembers in failedFiles.values() for failedFile in failedMembers]
+    writeOutput()
+
+# a function to run the watch mode, runs until it's stopped with ctrl+c
+def watch(args):
+    # results of every file {filename: urls}, and the failed files
+    results = {}
+    failedFiles = {}
+
+    pool = WorkerPool(args.jobs, args.task_timeout) if args.jobs > 1 else None
+    inotify = Inotify()
+
+    try:
+        # the watches are added before the first scan so we don't miss files created during it
+        inotify.add(os.getcwd())
+        for file in os.listdir(os.getcwd()):
+            if os.path.isdir(file):
+                inotify.add(os.getcwd() + "/" + file)
+
+        # the first scan
+        applyPendingChanges(dict.fromkeys(listFiles(), True), results, failedFiles, pool, args.pages_per_task)
+        writeWatchOutput(args, results, failedFiles)
+
+        pending = {}
+        firstPendingTime = None
+        while True:
+            timeout = None
+            if pending:
+                # wait until things are quiet, but don't wait forever during a long burst
+                timeout = max(0, min(args.debounce, firstPendingTime + 10 * args.debounce - time.time()))
+
+            events = inotify.read(timeout)
+            # our own output files are not documents
+            events = [(path, mask) for path, mask in events if path not in (os.getcwd() + "/output.csv", os.getcwd() + "/failed.csv")]
+
+            if events:
+                if not pending:
+                    firstPendingTime = time.time()
+                addPendingChanges(pending, events, inotify, results)
+                if timeout != 0:
+                    continue
+
+            if pending:
+                applyPendingChanges(pending, results, failedFiles, pool, args.pages_per_task)
+                writeWatchOutput(args, results, failedFiles)
+                pending = {}
+    except KeyboardInterrupt:
+        pass
+    finally:
+        inotify.close()
+        if pool is not None:
+            pool.close()
+
+#--------------------------------------------------
+
+# a function to run the --has-links triage: every file is only read until it has enough urls,
+# and the output is one row per file saying if it has links and how many (up to the limit)
+def triageFiles(filenames, jobs, timeout=TASK_TIMEOUT):
+    # file names, yes/no and url counts for the output table
+    names = []
+    hasLinks = []
+    counts = []
+
+    # the files are not split into page ranges, a pdf usually has its first link in the first pages
+    pool = WorkerPool(jobs, timeout) if jobs > 1 else None
+    try:
+        for filename, urls, failedFiles in extractFiles(filenames, pool, None):
+            failed.extend(failedFiles)
+            # only the files we can read, and not the ones that failed
+            if filename in failedFiles or not isDocument(filename):
+                continue
+            names.append(filename)
+            hasLinks.append("yes" if urls else "no")
+            counts.append(len(urls))
+    finally:
+        if pool is not None:
+            pool.close()
+
+    # we define a DataFrame with one row per file
+    df = pd.DataFrame({
+        'File Name & Directory': names,
+        'Has Links': hasLinks,
+        'URL Count': counts
+    })
+    df.to_csv('output.csv', index=True)
+
+    failedDF = pd.DataFrame(failed)
+    # create csv file with failed files
+    failedDF.to_csv('failed.csv', index=True)
+
+#--------------------------------------------------
+"""
+Service mode: instead of starting the script (and importing textract, PyPDF2, openpyxl and pandas)
+for every upload, other programs connect to a Unix socket and send one JSON request per line:
+    {"path": "/data/upload/report.pdf"}
+    {"name": "report.docx", "data": "<base64 of the file>"}
+    {"stats": true}
+The files are extracted by a pool of workers that stay running (they are forked after the imports,
+so they are warm from the first request). For every request the url rows are sent back as JSON
+lines, then one line {"done": true, "failed": [...], "ms": ...}. {"stats": true} gives the request
+latency histograms.
+"""
+
+# upper bounds in milliseconds of the latency histogram buckets, the last bucket has no bound
+LATENCY_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000]
+
+# a latency histogram for one kind of request, shared by the connection threads
+class LatencyHistogram:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.totalMs = 0.0
+        self.maxMs = 0.0
+
+    # a function to add the latency of one request
+    def add(self, ms):
+        bucket = 0
+        while bucket < len(LATENCY_BUCKETS) and ms > LATENCY_BUCKETS[bucket]:
+            bucket += 1
+        with self.lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.totalMs += ms
+            self.maxMs = max(self.maxMs, ms)
+
+    # a function to get the histogram as a dictionary for the stats request
+    def stats(self):
+        with self.lock:
+            buckets = {"<=%dms" % bound: count for bound, count in zip(LATENCY_BUCKETS, self.counts)}
+            buckets[">%dms" % LATENCY_BUCKETS[-1]] = self.counts[-1]
+            return {
+                "requests": self.count,
+                "meanMs": round(self.totalMs / self.count, 3) if self.count else 0,
+                "maxMs": round(self.maxMs, 3),
+                "buckets": buckets,
+            }
+
+# a function that runs in a worker to extract a file sent as bytes, returns (name, urls, failed files)
+def runBytesTask(task):
+    name, data = task
+    failedMembers = []
+    try:
+        return name, fileURLs(name, failedMembers, io.BytesIO(data)), failedMembers
+    except:
+        return name, [], [name]
+
+# a function for the tasks of a request whose worker died or timed out, the request gets an error line
+def raiseTaskError(task, error):
+    raise RuntimeError("%s: %s" % (task[0], error))
+
+# a function to turn a [url, filename, file type, location, canonical url] row into a JSON line
+def rowJSON(row):
+    url, filename, fileType, location, canonical = row
+    return json.dumps({"url": url, "file": filename, "type": fileType, "location": location, "canonical": canonical})
+
+# the handler of one connection, it reads requests until the client closes the connection
+class ExtractionRequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        service = self.server.service
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            start = time.perf_counter()
+            try:
+                request = json.loads(line)
+                if request.get("stats"):
+                    self.send([json.dumps(service.stats())])
+                    continue
+                kind, lines, failedFiles = service.answer(request)
+                last = {"done": True, "failed": failedFiles}
+            except Exception as error:
+                # a bad request only gets an error line, the connection stays open
+                kind, lines, last = "error", [], {"error": str(error)}
+
+            ms = (time.perf_counter() - start) * 1000
+            service.latencies[kind].add(ms)
+            last["ms"] = round(ms, 3)
+            lines.append(json.dumps(last))
+            self.send(lines)
+
+    # a function to send JSON lines to the client
+    def send(self, lines):
+        self.wfile.write(("\n".join(lines) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+# the threads of the server, one per connection
+class ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+# the extraction service: the pool of warm workers and the latency histograms
+class ExtractionService:
+
+    def __init__(self, jobs=1, pagesPerTask=PDF_PAGES_PER_TASK, timeout=TASK_TIMEOUT):
+        # there is always a pool, so a file that crashes or hangs a worker only fails its own request:
+        # the worker is killed (after the timeout if it hangs) and replaced, and the request gets an error line
+        self.pool = WorkerPool(jobs, timeout)
+        self.pagesPerTask = pagesPerTask
+        self.latencies = {"path": LatencyHistogram(), "bytes": LatencyHistogram(), "error": LatencyHistogram()}
+
+    # a function to get the latency histograms of every kind of request
+    def stats(self):
+        return {kind: histogram.stats() for kind, histogram in self.latencies.items()}
+
+    # a function to extract the file of one request
+    # returns the kind of request ("path" or "bytes"), the JSON lines of the url rows and the failed files
+    def answer(self, request):
+        if "data" in request:
+            kind = "bytes"
+            name = request.get("name", "upload")
+            results = list(self.pool.imap(runBytesTask, [(name, base64.b64decode(request["data"]))], raiseTaskError))
+        elif "path" in request:
+            kind = "path"
+            # big pdf files are split into page ranges on the workers, same as with --jobs
+            results = list(extractFiles([request["path"]], self.pool, self.pagesPerTask, raiseTaskError))
+        else:
+            raise ValueError("a request needs a path, data or stats")
+
+        lines = []
+        failedFiles = []
+        for filename, urls, failedMembers in results:
+            lines.extend(rowJSON(row) for row in canonicalURLs(urls))
+            failedFiles.extend(failedMembers)
+        return kind, lines, failedFiles
+
+    def close(self):
+        self.pool.close()
+
+# a function to run the service on a Unix socket, runs until it's stopped with ctrl+c
+def serve(args):
+    # a socket file left by a service that was killed is removed
+    if os.path.exists(args.socket):
+        os.remove(args.socket)
+
+    service = ExtractionService(args.jobs, args.pages_per_task, args.task_timeout)
+    server = ThreadingUnixServer(args.socket, ExtractionRequestHandler)
+    server.service = service
+    print("extraction service listening on " + args.socket)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        os.remove(args.socket)
+
+#--------------------------------------------------
+
+def main():
+    global all_urls
+
+    # reading the command line options
+    parser = argparse.ArgumentParser(description="Extract the hyperlinks from the documents in the current directory")
+    parser.add_argument("mode", nargs="?", default="scan", choices=["scan", "watch", "serve"], help="scan once, keep watching the directory for changes, or serve extraction requests on a socket")
+    parser.add_argument("--sort", action="store_true", help="sort the output by canonical url, file name and file type")
+    parser.add_argument("--dedup", action="store_true", help="remove rows with the same canonical url, file and location from the output (the output is sorted)")
+    parser.add_argument("--memory-budget", type=int, default=256, help="megabytes of rows to keep in memory before spilling sorted runs to disk (with --sort/--dedup)")
+    parser.add_argument("--jobs", type=int, default=1, help="number of worker processes")
+    parser.add_argument("--pages-per-task", type=int, default=PDF_PAGES_PER_TASK, help="pdf files with more pages are split into page-range tasks (with --jobs)")
+    parser.add_argument("--task-timeout", type=float, default=TASK_TIMEOUT, help="seconds a worker can spend on one task before it's killed and the file is counted as failed (with --jobs)")
+    parser.add_argument("--zip-depth", type=int, default=zipLimits["depth"], help="how many levels of nested zip archives are opened")
+    parser.add_argument("--zip-max-size", type=int, default=zipLimits["size"] // (1024 * 1024), help="megabytes, archive members bigger than this are not read")
+    parser.add_argument("--zip-max-ratio", type=int, default=zipLimits["ratio"], help="archive members compressed more than this ratio are not read")
+    parser.add_argument("--pdf-memory", action="store_true", help="print the peak memory used for every pdf file")
+    parser.add_argument("--has-links", type=int, nargs="?", const=1, default=None, metavar="N", help="only check which files have links: stop reading a file after N urls (default 1) and output a yes/no/count row per file")
+    parser.add_argument("--debounce", type=float, default=2.0, help="seconds without changes before a batch of changes is extracted (watch mode)")
+    parser.add_argument("--socket", default="url_extractor.sock", help="path of the Unix socket (serve mode)")
+    args = parser.parse_args()
+
+    zipLimits["depth"] = args.zip_depth
+    zipLimits["size"] = args.zip_max_size * 1024 * 1024
+    zipLimits["ratio"] = args.zip_max_ratio
+    pdfOptions["reportMemory"] = args.pdf_memory
+
+    if args.mode == "watch":
+        watch(args)
+        return
+
+    if args.mode == "serve":
+        serve(args)
+        return
+
+    if args.has_links is not None:
+        triage["limit"] = args.has_links
+        triageFiles(listFiles(), args.jobs, args.task_timeout)
+        return
+
+    all_urls = newURLList(args)
+
+    filesToExtract = listFiles()
+    if args.jobs > 1:
+        extractURLsParallel(filesToExtract, args.jobs, args.pages_per_task, args.task_timeout)
+    else:
+        for filename in filesToExtract:
+            extractURLs(filename)
 
-failedDF = pd.DataFrame(failed)
+    writeOutput()
 
-# we append the DataFrame to the csv, with indexing enabled
-df.to_csv('output.csv', index=True)
-# create csv file with failed files
-failedDF.to_csv('failed.csv', index=True)
\ No newline at end of file
+if __name__ == "__main__":
+    main()